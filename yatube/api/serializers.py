@@ -0,0 +1,37 @@
+from django.core.files.storage import default_storage
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated_at', 'image',
+               'author__username', 'group__slug')
+
+
+class PostSerializer:
+    """Сериализует строки queryset.values() без создания моделей.
+
+    prefix позволяет отдавать посты через связанную модель (лента
+    подписок: TimelineEntry -> post__*), extra - поля ключа пагинации.
+    """
+
+    def __init__(self, prefix='', id_lookup='id', extra=()):
+        self.lookups = [id_lookup] + [
+            prefix + field for field in POST_FIELDS[1:]]
+        self.extra = [field for field in extra if field not in self.lookups]
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups, *self.extra)
+
+    def row_key(self, row):
+        """Всё, что попадёт в JSON, - основа для сильного ETag."""
+        return tuple(row[lookup] for lookup in self.lookups)
+
+    def serialize(self, row):
+        (post_id, text, pub_date, updated_at, image, author,
+         group) = self.row_key(row)
+        return {
+            'id': post_id,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'updated_at': updated_at.isoformat(),
+            'image': default_storage.url(image) if image else None,
+            'author': author,
+            'group': group,
+        }
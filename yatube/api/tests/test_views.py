@@ -0,0 +1,171 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.query_budget import QueryBudgetMixin
+from posts.follow_graph import following_ids
+from posts.models import AuthorStats, Follow, Group, Post, TimelineEntry
+from posts.tasks import backfill_timeline
+from posts.tests.utils import run_on_commit
+from posts.views import COUNT_POSTS_ON_PAGE
+
+User = get_user_model()
+EXTRA_POSTS = 3
+
+
+class FeedApiTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='test', slug='test', description='test group')
+        for number in range(COUNT_POSTS_ON_PAGE + EXTRA_POSTS):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        backfill_timeline(cls.reader.pk, cls.author.pk)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_are_cursor_paginated(self):
+        urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': 'test'}),
+            reverse('api:profile_posts', kwargs={'username': 'NoName'}),
+            reverse('api:follow'),
+        ]
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('pk', flat=True))
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).json()
+                second = self.authorized_client.get(first['next']).json()
+                ids = [post['id'] for post in
+                       first['results'] + second['results']]
+                self.assertEqual(ids, expected)
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0]['author'], 'NoName')
+                self.assertEqual(first['results'][0]['group'], 'test')
+
+    def test_if_none_match_returns_304(self):
+        url = reverse('api:posts')
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        post = Post.objects.order_by('-pub_date', '-id').first()
+        post.text = 'Изменён'
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_requires_login(self):
+        response = self.guest_client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        response = self.authorized_client.get(reverse('api:follow'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_unknown_group_404(self):
+        response = self.guest_client.get(
+            reverse('api:group_posts', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+    def _add_posts(self):
+        for number in range(EXTRA_POSTS):
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Ещё {number}')
+        backfill_timeline(self.reader.pk, self.author.pk)
+
+    def test_query_budget(self):
+        urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': 'test'}),
+            reverse('api:profile_posts', kwargs={'username': 'NoName'}),
+            reverse('api:follow'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(
+                    self.authorized_client, url, self._add_posts)
+
+
+class FollowingApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{number}')
+            for number in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        Follow.objects.create(user=cls.reader, author=cls.authors[1])
+        backfill_timeline(cls.reader.pk, cls.authors[0].pk)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _import(self, payload):
+        return self.client.post(reverse('api:import_following'),
+                                json.dumps(payload),
+                                content_type='application/json')
+
+    def test_export(self):
+        response = self.client.get(reverse('api:following'))
+        self.assertEqual(response.json(),
+                         {'following': ['Author0', 'Author1']})
+        response = Client().get(reverse('api:following'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_import_replaces_list(self):
+        following_ids(self.reader.pk)
+        with run_on_commit():
+            response = self._import(
+                {'following': ['Author1', 'Author2', 'Reader', 'Ghost']})
+        self.assertEqual(response.json(), {
+            'following': ['Author1', 'Author2'],
+            'added': 1,
+            'removed': 1,
+            'unknown': ['Ghost'],
+        })
+        self.assertEqual(following_ids(self.reader.pk),
+                         {self.authors[1].pk, self.authors[2].pk})
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author=self.authors[0]).exists())
+        stats = AuthorStats.objects.in_bulk(
+            [self.reader.pk, self.authors[0].pk, self.authors[2].pk])
+        self.assertEqual(stats[self.reader.pk].following_count, 2)
+        self.assertEqual(stats[self.authors[0].pk].followers_count, 0)
+        self.assertEqual(stats[self.authors[2].pk].followers_count, 1)
+
+    def test_import_uses_one_insert_and_one_delete(self):
+        with CaptureQueriesContext(connection) as queries:
+            self._import({'following': ['Author2']})
+        writes = [query['sql'].split()[0] for query in queries
+                  if '"posts_follow"' in query['sql']
+                  and not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, ['INSERT', 'DELETE'])
+
+    def test_import_rejects_bad_payload(self):
+        for payload in ({}, {'following': 'Author1'}, {'following': [1]}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self._import(payload).status_code, 400)
+        self.assertEqual(Follow.objects.count(), 2)
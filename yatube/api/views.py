@@ -0,0 +1,166 @@
+import hashlib
+import json
+
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_POST, require_safe
+
+from core.paginator import get_cursor_page
+from core.query_budget import query_budget
+from posts.follow_graph import replace_following
+from posts.models import Group, Post, TimelineEntry, User
+from posts.views import COUNT_POSTS_ON_PAGE
+
+from .serializers import PostSerializer
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+FOLLOW_IMPORT_LIMIT = 1000
+
+
+def _etag(serializer, page_obj):
+    source = repr((
+        [serializer.row_key(row) for row in page_obj],
+        page_obj.next_cursor,
+        page_obj.previous_cursor,
+    ))
+    return '"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _not_modified(request, etag):
+    # If-None-Match сравнивается слабо (RFC 7232): gzip-прокси могут
+    # превратить наш ETag в W/"...".
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or _opaque(etag) in map(_opaque, etags)
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Требуется авторизация.'}, status=401)
+
+
+def _page_url(request, querystring, present):
+    if not present:
+        return None
+    return request.build_absolute_uri(request.path + querystring)
+
+
+def feed_response(request, queryset, serializer,
+                  ordering=('pub_date', 'id'), private=False):
+    """Страница ленты в JSON с сильным ETag.
+
+    ETag считается по тем же полям, что уходят в JSON, поэтому на
+    совпавший If-None-Match отвечаем 304, ничего не сериализуя.
+    """
+    page_obj = get_cursor_page(request, serializer.values(queryset),
+                               COUNT_POSTS_ON_PAGE, ordering)
+    etag = _etag(serializer, page_obj)
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({
+            'results': [serializer.serialize(row) for row in page_obj],
+            'next': _page_url(request, page_obj.next_querystring,
+                              page_obj.has_next()),
+            'previous': _page_url(request, page_obj.previous_querystring,
+                                  page_obj.has_previous()),
+        }, json_dumps_params=JSON_PARAMS)
+    response['ETag'] = etag
+    if private:
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Cookie'
+    else:
+        response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+@require_safe
+@query_budget(1)
+def posts(request):
+    return feed_response(request, Post.objects.all(), PostSerializer())
+
+
+@require_safe
+@query_budget(2)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return feed_response(
+        request, Post.objects.filter(group=group), PostSerializer())
+
+
+@require_safe
+@query_budget(2)
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return feed_response(
+        request, Post.objects.filter(author=author), PostSerializer())
+
+
+@require_safe
+@query_budget(3)
+def follow(request):
+    if not request.user.is_authenticated:
+        return _unauthorized()
+    serializer = PostSerializer(
+        prefix='post__', id_lookup='post_id', extra=('pub_date',))
+    return feed_response(
+        request, TimelineEntry.objects.filter(user=request.user), serializer,
+        ordering=('pub_date', 'post_id'), private=True)
+
+
+@require_safe
+@query_budget(1)
+def following(request):
+    """Экспорт подписок: список имён авторов."""
+    if not request.user.is_authenticated:
+        return _unauthorized()
+    usernames = (User.objects
+                 .filter(following__user=request.user)
+                 .order_by('username')
+                 .values_list('username', flat=True))
+    response = JsonResponse({'following': list(usernames)},
+                            json_dumps_params=JSON_PARAMS)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _parse_usernames(body):
+    try:
+        usernames = json.loads(body)['following']
+    except (ValueError, KeyError, TypeError):
+        return None
+    if (not isinstance(usernames, list)
+            or len(usernames) > FOLLOW_IMPORT_LIMIT
+            or not all(isinstance(name, str) for name in usernames)):
+        return None
+    return set(usernames)
+
+
+@require_POST
+def import_following(request):
+    """Импорт подписок: {"following": [...]} заменяет текущий список."""
+    if not request.user.is_authenticated:
+        return _unauthorized()
+    usernames = _parse_usernames(request.body)
+    if usernames is None:
+        return JsonResponse({
+            'detail': 'Ожидается {"following": [имена]}, '
+                      f'не больше {FOLLOW_IMPORT_LIMIT}.'}, status=400)
+    authors = dict(User.objects
+                   .filter(username__in=usernames)
+                   .exclude(pk=request.user.pk)
+                   .values_list('username', 'pk'))
+    added, removed = replace_following(request.user.pk, authors.values())
+    return JsonResponse({
+        'following': sorted(authors),
+        'added': len(added),
+        'removed': len(removed),
+        'unknown': sorted(usernames - set(authors)
+                          - {request.user.username}),
+    }, json_dumps_params=JSON_PARAMS)
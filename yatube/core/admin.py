@@ -0,0 +1,38 @@
+from django.contrib import admin
+
+from .models import RequestProfile, SlowQuery
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = (
+        'normalized_sql',
+        'view_name',
+        'count',
+        'total_duration',
+        'average_duration',
+        'max_duration',
+        'last_seen',
+    )
+    list_filter = ('view_name',)
+    search_fields = ('normalized_sql', 'view_name')
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    def average_duration(self, obj):
+        return round(obj.total_duration / obj.count, 4)
+    average_duration.short_description = 'Среднее время, с'
+
+    def has_add_permission(self, request):
+        return False
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('view_name', 'path', 'duration', 'samples', 'created')
+    list_filter = ('view_name',)
+    readonly_fields = [field.name for field in RequestProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(SlowQuery, SlowQueryAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
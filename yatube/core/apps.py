@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .slow_queries import install
+        from .sqlite import configure_connection
+
+        connection_created.connect(
+            configure_connection, dispatch_uid='sqlite_pragmas')
+        connection_created.connect(install, dispatch_uid='slow_queries')
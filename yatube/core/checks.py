@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Без DEBUG кеш default должен быть общим для воркеров и Celery."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in LOCAL_CACHES:
+        return []
+    return [Error(
+        'Кеш default локален для процесса: сброс поколений страниц из '
+        'других воркеров и задач Celery до него не дойдёт.',
+        hint='Задайте CACHE_URL (Redis).',
+        id='core.E001',
+    )]
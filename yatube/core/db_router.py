@@ -0,0 +1,86 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+def replicas_allowed():
+    return getattr(_local, 'replicas_allowed', False)
+
+
+@contextmanager
+def read_from_replicas(allowed=True):
+    """Разрешает (или запрещает) чтение с реплик внутри блока."""
+    previous = replicas_allowed()
+    _local.replicas_allowed = allowed
+    try:
+        yield
+    finally:
+        _local.replicas_allowed = previous
+
+
+class PrimaryReplicaRouter:
+    """Чтение - с реплик из REPLICA_DATABASES, запись - в default.
+
+    Реплики используются только там, где их разрешил
+    ReplicaPinningMiddleware: в безопасных запросах, не закреплённых за
+    primary. Фоновые задачи и команды всегда читают из default - реплика
+    может отставать. Внутри транзакции чтение тоже идёт в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if (not replicas or not replicas_allowed()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Запрос, который пишет, дальше читает только из primary.
+        _local.wrote = True
+        _local.replicas_allowed = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема и данные попадают на реплики репликацией.
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaPinningMiddleware:
+    """Закрепляет клиента за primary на REPLICA_PIN_SECONDS после записи.
+
+    Пишущие методы целиком идут в primary. После ответа, в котором была
+    запись, ставится cookie: пока реплика догоняет, пользователь читает
+    свои же изменения из primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allowed = (bool(settings.REPLICA_DATABASES)
+                   and request.method in SAFE_METHODS
+                   and PIN_COOKIE not in request.COOKIES)
+        _local.wrote = False
+        with read_from_replicas(allowed):
+            response = self.get_response(request)
+        wrote, _local.wrote = _local.wrote, False
+        if settings.REPLICA_DATABASES and (
+                wrote or request.method not in SAFE_METHODS):
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True)
+        return response
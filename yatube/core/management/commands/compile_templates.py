@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templates_warmup import compile_templates
+
+
+class Command(BaseCommand):
+    help = ('Разбирает все шаблоны проекта и падает на первой же '
+            'синтаксической ошибке - для проверки при выкладке')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Включая шаблоны сторонних приложений (admin и др.)')
+
+    def handle(self, *args, **options):
+        compiled, errors = compile_templates(project_only=not options['all'])
+        for name, error in errors:
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'Ошибок в шаблонах: {len(errors)}')
+        self.stdout.write(f'Шаблонов разобрано: {compiled}')
@@ -0,0 +1,47 @@
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RequestProfile
+from core.profiling import parse_stacks
+
+
+class Command(BaseCommand):
+    help = ('Сливает сэмплы профилировщика по view и пишет файлы '
+            'collapsed stacks для flamegraph.pl / speedscope')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir')
+        parser.add_argument('--view', action='append', dest='views',
+                            help='Имя view, например posts:post_detail')
+        parser.add_argument('--days', type=int,
+                            help='Только профили за последние N дней')
+
+    def handle(self, *args, **options):
+        profiles = RequestProfile.objects.exclude(stacks='')
+        if options['views']:
+            profiles = profiles.filter(view_name__in=options['views'])
+        if options['days']:
+            profiles = profiles.filter(
+                created__gte=timezone.now() - timedelta(days=options['days']))
+        merged = defaultdict(Counter)
+        requests = Counter()
+        for view_name, stacks in profiles.values_list(
+                'view_name', 'stacks').iterator():
+            view_name = view_name or 'unresolved'
+            merged[view_name].update(parse_stacks(stacks))
+            requests[view_name] += 1
+        os.makedirs(options['output_dir'], exist_ok=True)
+        for view_name, stacks in sorted(merged.items()):
+            filename = re.sub(r'[^\w.-]', '_', view_name) + '.folded'
+            path = os.path.join(options['output_dir'], filename)
+            with open(path, 'w', encoding='utf-8') as output:
+                for stack, count in sorted(stacks.items()):
+                    output.write(f'{stack} {count}\n')
+            self.stdout.write(
+                f'{path}: запросов {requests[view_name]}, '
+                f'сэмплов {sum(stacks.values())}')
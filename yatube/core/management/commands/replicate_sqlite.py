@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Замена репликации для локальной разработки: копирует SQLite-базу '
+            'primary во все реплики через backup API')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять копирование каждые N секунд')
+
+    def _copy(self, source_name, replicas):
+        started = time.perf_counter()
+        source = sqlite3.connect(source_name)
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+        finally:
+            source.close()
+        self.stdout.write(
+            f'Скопировано в {", ".join(replicas)} '
+            f'за {time.perf_counter() - started:.2f} с')
+
+    def handle(self, *args, **options):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas:
+            raise CommandError('Реплики не настроены: задайте '
+                               'DATABASE_REPLICAS')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite')
+        while True:
+            self._copy(primary['NAME'], replicas)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+# Счётчики хранятся целыми числами: время - в микросекундах, чтобы
+# работал атомарный cache.incr.
+FIELDS = ('requests', 'duration_us', 'db_queries', 'db_duration_us',
+          'template_duration_us', 'response_bytes')
+BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+ALL_FIELDS = FIELDS + tuple(f'bucket:{le}' for le in BUCKETS + ('+Inf',))
+NAMES_KEY = 'metrics:names'
+UNRESOLVED = 'unresolved'
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.template_duration = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_duration += time.perf_counter() - started
+            self.db_queries += 1
+
+
+class Collector:
+    """Копит счётчики в памяти процесса и раз в flush_interval секунд
+    сбрасывает их в кеш, общий для всех воркеров."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(lambda: defaultdict(int))
+        self.last_flush = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[settings.METRICS_CACHE]
+
+    def record(self, view_name, duration, metrics, response_bytes):
+        bucket = next((le for le in BUCKETS if duration <= le), '+Inf')
+        with self.lock:
+            values = self.pending[view_name]
+            values['requests'] += 1
+            values['duration_us'] += int(duration * 1e6)
+            values['db_queries'] += metrics.db_queries
+            values['db_duration_us'] += int(metrics.db_duration * 1e6)
+            values['template_duration_us'] += int(
+                metrics.template_duration * 1e6)
+            values['response_bytes'] += response_bytes
+            values[f'bucket:{bucket}'] += 1
+            due = (time.monotonic() - self.last_flush
+                   >= settings.METRICS_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def _incr(self, key, delta):
+        try:
+            self.cache.incr(key, delta)
+        except ValueError:
+            if not self.cache.add(key, delta, None):
+                self.cache.incr(key, delta)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(
+                lambda: defaultdict(int))
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        names = set(self.cache.get(NAMES_KEY, ()))
+        if not names.issuperset(pending):
+            self.cache.set(NAMES_KEY, sorted(names | set(pending)), None)
+        for view_name, values in pending.items():
+            for field, delta in values.items():
+                self._incr(f'metrics:{view_name}:{field}', delta)
+
+    def snapshot(self):
+        """{view_name: {поле: значение}} по данным всех воркеров."""
+        self.flush()
+        names = self.cache.get(NAMES_KEY, ())
+        keys = [f'metrics:{name}:{field}'
+                for name in names for field in ALL_FIELDS]
+        values = self.cache.get_many(keys)
+        return {
+            name: {field: values.get(f'metrics:{name}:{field}', 0)
+                   for field in ALL_FIELDS}
+            for name in names
+        }
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+        names = self.cache.get(NAMES_KEY, ())
+        self.cache.delete_many(
+            [f'metrics:{name}:{field}'
+             for name in names for field in ALL_FIELDS] + [NAMES_KEY])
+
+
+collector = Collector()
+
+
+def current_request_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+class MetricsMiddleware:
+    """Время, запросы к БД, рендер шаблонов и размер ответа по имени URL.
+
+    Ставится первым в MIDDLEWARE, чтобы учитывать и остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED
+        size = 0 if response.streaming else len(response.content)
+        collector.record(view_name, duration, metrics, size)
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current_request_metrics()
+        if metrics is None:
+            return super().render(context, request)
+        # Вложенные render_to_string (теги, кеш карточек) уже входят
+        # во внешний рендер - считаем только его.
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_duration += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates, который замеряет время рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self)
+
+
+def _value(value, scale=1):
+    return str(value) if scale == 1 else f'{value * scale:.6f}'
+
+
+def _label(view_name):
+    return view_name.replace('\\', '\\\\').replace('"', '\\"')
+
+
+METRICS = (
+    ('yatube_requests_total', 'counter', 'Число запросов',
+     'requests', 1),
+    ('yatube_db_queries_total', 'counter', 'Число запросов к БД',
+     'db_queries', 1),
+    ('yatube_db_duration_seconds_total', 'counter', 'Время в БД',
+     'db_duration_us', 1e-6),
+    ('yatube_template_duration_seconds_total', 'counter',
+     'Время рендера шаблонов', 'template_duration_us', 1e-6),
+    ('yatube_response_bytes_total', 'counter', 'Объём ответов',
+     'response_bytes', 1),
+)
+
+
+def render_prometheus(snapshot):
+    """Текстовый формат экспозиции Prometheus."""
+    lines = []
+    for metric, kind, help_text, field, scale in METRICS:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for name, values in sorted(snapshot.items()):
+            lines.append(f'{metric}{{view="{_label(name)}"}} '
+                         f'{_value(values[field], scale)}')
+    metric = 'yatube_request_duration_seconds'
+    lines += [f'# HELP {metric} Время ответа',
+              f'# TYPE {metric} histogram']
+    for name, values in sorted(snapshot.items()):
+        label = _label(name)
+        total = 0
+        for le in BUCKETS + ('+Inf',):
+            total += values[f'bucket:{le}']
+            lines.append(
+                f'{metric}_bucket{{view="{label}",le="{le}"}} {total}')
+        lines.append(f'{metric}_sum{{view="{label}"}} '
+                     f'{_value(values["duration_us"], 1e-6)}')
+        lines.append(f'{metric}_count{{view="{label}"}} {values["requests"]}')
+    return '\n'.join(lines) + '\n'
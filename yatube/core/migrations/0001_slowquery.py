@@ -0,0 +1,37 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Отпечаток')),
+                ('normalized_sql', models.TextField(verbose_name='Нормализованный SQL')),
+                ('sql', models.TextField(verbose_name='Пример SQL')),
+                ('params', models.TextField(blank=True, verbose_name='Параметры примера')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек вызова')),
+                ('plan', models.TextField(blank=True, verbose_name='План запроса')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Сколько раз')),
+                ('total_duration', models.FloatField(default=0, verbose_name='Суммарное время, с')),
+                ('max_duration', models.FloatField(default=0, verbose_name='Максимальное время, с')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ('-total_duration',),
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_slowquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(db_index=True, max_length=200, verbose_name='View')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('duration', models.FloatField(verbose_name='Время ответа, с')),
+                ('samples', models.PositiveIntegerField(verbose_name='Сэмплов')),
+                ('stacks', models.TextField(blank=True, verbose_name='Стеки')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """Медленные запросы, сгруппированные по нормализованному SQL."""
+    fingerprint = models.CharField('Отпечаток', max_length=32, unique=True)
+    normalized_sql = models.TextField('Нормализованный SQL')
+    sql = models.TextField('Пример SQL')
+    params = models.TextField('Параметры примера', blank=True)
+    view_name = models.CharField('View', max_length=200, blank=True)
+    stack = models.TextField('Стек вызова', blank=True)
+    plan = models.TextField('План запроса', blank=True)
+    count = models.PositiveIntegerField('Сколько раз', default=1)
+    total_duration = models.FloatField('Суммарное время, с', default=0)
+    max_duration = models.FloatField('Максимальное время, с', default=0)
+    first_seen = models.DateTimeField('Впервые', auto_now_add=True)
+    last_seen = models.DateTimeField('Последний раз', auto_now=True)
+
+    class Meta:
+        ordering = ('-total_duration',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self) -> str:
+        return self.normalized_sql[:50]
+
+
+class RequestProfile(models.Model):
+    """Сэмплы стека одного запроса в формате collapsed stacks."""
+    view_name = models.CharField('View', max_length=200, db_index=True)
+    path = models.CharField('Адрес', max_length=500)
+    duration = models.FloatField('Время ответа, с')
+    samples = models.PositiveIntegerField('Сэмплов')
+    stacks = models.TextField('Стеки', blank=True)
+    created = models.DateTimeField('Дата', auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self) -> str:
+        return f'{self.view_name} {self.duration:.3f} с'
@@ -0,0 +1,184 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(values, direction=NEXT):
+    raw = '|'.join([direction] + [_dump(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, [значения]) или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    direction, *values = raw.split('|')
+    if direction not in (NEXT, PREVIOUS) or not values:
+        return None
+    return direction, values
+
+
+def _dump(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _load(field, value):
+    if field.get_internal_type() == 'DateTimeField':
+        return parse_datetime(value)
+    return field.to_python(value)
+
+
+class CursorPage:
+    """Страница keyset-пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page, которой
+    пользуются шаблоны: итерация, len, has_next/has_previous.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor,
+                 cursor=None, params=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.cursor = cursor
+        self.params = params or {}
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, cursor):
+        params = dict(self.params)
+        if cursor is not None:
+            params[CURSOR_PARAM] = cursor
+        return '?' + urlencode(params) if params else '?'
+
+    @property
+    def first_querystring(self):
+        return self._querystring(None)
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+
+class CursorPaginator:
+    """Пагинация по ключу (ordering) вместо OFFSET + COUNT(*).
+
+    Все поля ordering сортируются по убыванию, последнее поле должно быть
+    уникальным (обычно id), чтобы ключ однозначно задавал позицию.
+    Стоимость любой страницы - один индексный диапазон на per_page + 1 строк.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('pub_date', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [
+            queryset.model._meta.get_field(name) for name in ordering
+        ]
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            # Строки queryset.values(): поля ordering должны быть среди ключей.
+            return [obj[field.attname] for field in self.fields]
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def _seek(self, values, lookup):
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field.attname}__{lookup}': values[i]})
+            for previous, value in zip(self.fields[:i], values):
+                step &= Q(**{previous.attname: value})
+            condition |= step
+        # Избыточное условие на первое поле ключа: из одного OR SQLite не
+        # всегда выводит диапазон и тогда обходит индекс с начала ленты.
+        bound = 'lte' if lookup == 'lt' else 'gte'
+        first = self.fields[0].attname
+        return Q(**{f'{first}__{bound}': values[0]}) & condition
+
+    def _parse(self, cursor):
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return None, None
+        direction, raw_values = decoded
+        if len(raw_values) != len(self.fields):
+            return None, None
+        try:
+            values = [
+                _load(field, value)
+                for field, value in zip(self.fields, raw_values)
+            ]
+        except Exception:
+            return None, None
+        if any(value is None for value in values):
+            return None, None
+        return direction, values
+
+    def get_page(self, cursor=None, params=None):
+        direction, values = self._parse(cursor)
+        descending = [f'-{name}' for name in self.ordering]
+        queryset = self.queryset
+        if direction == PREVIOUS:
+            rows = list(
+                queryset.filter(self._seek(values, 'gt'))
+                .order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_more_before = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_more_after = True
+        else:
+            if direction == NEXT:
+                queryset = queryset.filter(self._seek(values, 'lt'))
+            rows = list(queryset.order_by(*descending)[:self.per_page + 1])
+            has_more_after = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_more_before = direction == NEXT
+        next_cursor = previous_cursor = None
+        if rows and has_more_after:
+            next_cursor = encode_cursor(self._key(rows[-1]), NEXT)
+        if rows and has_more_before:
+            previous_cursor = encode_cursor(self._key(rows[0]), PREVIOUS)
+        return CursorPage(rows, next_cursor, previous_cursor,
+                          cursor=cursor if direction else None,
+                          params=params)
+
+
+def get_cursor_page(request, queryset, per_page, ordering=('pub_date', 'id')):
+    params = request.GET.copy()
+    cursor = params.pop(CURSOR_PARAM, [None])[-1]
+    params.pop('page', None)
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    return paginator.get_page(cursor, params=params.dict())
@@ -0,0 +1,122 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = 'core.profiling'
+
+
+def make_profile_token():
+    """Значение заголовка, по которому запрос профилируется всегда."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def _valid_token(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(settings.BASE_DIR):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(
+        ';', ':')
+
+
+def collapse(frame):
+    """Стек в формате collapsed (от корня к листу через ';')."""
+    labels = []
+    while frame is not None:
+        if frame.f_code.co_filename != __file__:
+            labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """Фоновый поток, который раз в interval секунд снимает стек потока."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+def format_stacks(stacks):
+    return '\n'.join(f'{stack} {count}' for stack, count in stacks.items())
+
+
+def parse_stacks(text):
+    stacks = Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+    return stacks
+
+
+class ProfilingMiddleware:
+    """Сэмплирует стек доли PROFILER_SAMPLE_RATE запросов и запросов
+    с подписанным заголовком X-Profile, результат - в RequestProfile."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _should_profile(self, request):
+        token = request.META.get('HTTP_X_PROFILE')
+        if token:
+            return _valid_token(token)
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+        from .models import RequestProfile
+
+        sampler = StackSampler(
+            threading.get_ident(),
+            settings.PROFILER_INTERVAL_MS / 1000).start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        match = getattr(request, 'resolver_match', None)
+        profile = RequestProfile.objects.create(
+            view_name=match.view_name if match else '',
+            path=request.get_full_path()[:500],
+            duration=time.perf_counter() - started,
+            samples=sum(stacks.values()),
+            stacks=format_stacks(stacks))
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,77 @@
+import logging
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+logger = logging.getLogger('yatube.query_budget')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def query_budget(limit):
+    """Объявляет, сколько запросов к БД может сделать view.
+
+    Бюджет проверяют тесты (QueryBudgetMixin). При DEBUG превышение
+    дополнительно пишется в лог yatube.query_budget.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.DEBUG:
+                return view(request, *args, **kwargs)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+            if counter.count > limit:
+                logger.warning('%s: %s запросов при бюджете %s',
+                               request.path, counter.count, limit)
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+def get_query_budget(view):
+    budget = getattr(view, 'query_budget', None)
+    if budget is None and hasattr(view, 'view_class'):
+        budget = getattr(view.view_class.dispatch, 'query_budget', None)
+    return budget
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase.
+
+    assertQueryBudget(client, url, grow) открывает страницу, добавляет
+    данные функцией grow() и открывает снова: число запросов должно
+    совпадать (нет N+1) и укладываться в бюджет view из @query_budget.
+    """
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries), context.captured_queries
+
+    def assertQueryBudget(self, client, url, grow):
+        budget = get_query_budget(resolve(url.split('?')[0]).func)
+        self.assertIsNotNone(budget, f'{url}: у view не задан query_budget')
+        before, _ = self.count_queries(client, url)
+        grow()
+        after, queries = self.count_queries(client, url)
+        sql = '\n'.join(query['sql'] for query in queries)
+        self.assertEqual(before, after, f'{url}: N+1 запросов\n{sql}')
+        self.assertLessEqual(after, budget, f'{url}: бюджет превышен\n{sql}')
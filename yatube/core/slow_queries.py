@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('yatube.slow_queries')
+
+STACK_DEPTH = 8
+MAX_PARAMS_LENGTH = 1000
+
+_local = threading.local()
+_explained = set()
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalize_sql(sql):
+    """SQL без литералов и параметров: одинаков у запросов одной формы."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()
+
+
+def _project_stack():
+    """Последние кадры стека из кода проекта, без Django и этого модуля."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def _explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as error:
+        return f'EXPLAIN не удался: {error}'
+
+
+class SlowQueryLogger:
+    """execute_wrapper: пишет запросы дольше SLOW_QUERY_THRESHOLD_MS.
+
+    Запросы одной формы копятся в одной строке SlowQuery; EXPLAIN
+    выполняется один раз на форму.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if (threshold is not None and duration * 1000 >= threshold
+                and not getattr(_local, 'active', False)):
+            _local.active = True
+            try:
+                self.record(sql, None if many else params, duration)
+            except Exception:
+                logger.exception('Не удалось записать медленный запрос')
+            finally:
+                _local.active = False
+        return result
+
+    def record(self, sql, params, duration):
+        from .models import SlowQuery
+
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        view_name = getattr(_local, 'view_name', '')
+        stack = _project_stack()
+        logger.warning('%.1f мс [%s] %s\nПараметры: %r\n%s',
+                       duration * 1000, view_name or '-', sql,
+                       params, stack)
+        # Запрос мог выполниться на реплике, а писать можно только в
+        # primary. Не через router.db_for_write: он закрепил бы клиента
+        # за primary из-за медленного чтения.
+        alias = DEFAULT_DB_ALIAS
+        rows = SlowQuery.objects.using(alias)
+        # Savepoint: ошибка записи не должна ломать транзакцию запроса.
+        with transaction.atomic(using=alias):
+            updated = rows.filter(fingerprint=key).update(
+                count=F('count') + 1,
+                total_duration=F('total_duration') + duration,
+                max_duration=Greatest('max_duration', Value(duration)),
+                last_seen=timezone.now())
+        if updated:
+            return
+        plan = ''
+        if key not in _explained:
+            _explained.add(key)
+            plan = _explain(self.connection, sql, params)
+            logger.warning('План запроса %s:\n%s', key, plan)
+        try:
+            with transaction.atomic(using=alias):
+                rows.create(
+                    fingerprint=key, normalized_sql=normalized, sql=sql,
+                    params=repr(params)[:MAX_PARAMS_LENGTH],
+                    view_name=view_name, stack=stack, plan=plan,
+                    total_duration=duration, max_duration=duration)
+        except IntegrityError:
+            pass
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: вешает логгер на новое соединение.
+
+    Соединение часто открывается внутри блока execute_wrapper() (метрики
+    запроса, бюджет запросов), а на выходе блок снимает последнюю обёртку
+    списка. Поэтому логгер кладётся в начало списка, под чужие обёртки.
+    """
+    if not any(isinstance(wrapper, SlowQueryLogger)
+               for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, SlowQueryLogger(connection))
+
+
+class SlowQueryViewMiddleware:
+    """Запоминает имя view, чтобы привязать к нему медленные запросы."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            _local.view_name = ''
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _local.view_name = request.resolver_match.view_name
@@ -0,0 +1,86 @@
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_write_lock = threading.RLock()
+
+
+def _begin_immediate(connection):
+    # BEGIN IMMEDIATE сразу берёт блокировку записи: транзакция, которая
+    # сначала читает, а потом пишет, ждёт busy_timeout, а не падает с
+    # «database is locked» при попытке повысить блокировку.
+    connection.cursor().execute('BEGIN IMMEDIATE')
+
+
+def _begin_serialized(connection):
+    """BEGIN IMMEDIATE под мьютексом процесса.
+
+    Потоки процесса ждут своей очереди на мьютексе, а не крутятся в
+    busy_timeout. Мьютекс отпускается на COMMIT, ROLLBACK или при
+    закрытии соединения - так очередь проходят все транзакции: из view
+    с любым методом, из задач Celery и команд.
+    """
+    _write_lock.acquire()
+    try:
+        _begin_immediate(connection)
+    except BaseException:
+        _write_lock.release()
+        raise
+    connection.holds_write_lock = True
+
+
+def _release_write_lock(connection):
+    if getattr(connection, 'holds_write_lock', False):
+        connection.holds_write_lock = False
+        _write_lock.release()
+
+
+def _install_write_lock_release(connection):
+    commit, rollback, close = (
+        connection._commit, connection._rollback, connection._close)
+
+    def _commit():
+        # Неудачный COMMIT оставляет транзакцию открытой до ROLLBACK.
+        result = commit()
+        _release_write_lock(connection)
+        return result
+
+    def _rollback():
+        try:
+            return rollback()
+        finally:
+            _release_write_lock(connection)
+
+    def _close():
+        try:
+            return close()
+        finally:
+            _release_write_lock(connection)
+
+    connection._commit = _commit
+    connection._rollback = _rollback
+    connection._close = _close
+    connection.releases_write_lock = True
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA из SQLITE_PRAGMAS, а для
+    primary - режим начала транзакций и очередь пишущих транзакций."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    # Реплики только читают: BEGIN IMMEDIATE и очередь записи - для primary.
+    if (not settings.SQLITE_IMMEDIATE_TRANSACTIONS
+            or connection.alias != DEFAULT_DB_ALIAS):
+        return
+    if not settings.SQLITE_SERIALIZE_WRITES:
+        connection._start_transaction_under_autocommit = (
+            lambda: _begin_immediate(connection))
+        return
+    # connection_created приходит на каждое переподключение обёртки.
+    if not getattr(connection, 'releases_write_lock', False):
+        _install_write_lock_release(connection)
+    connection._start_transaction_under_autocommit = (
+        lambda: _begin_serialized(connection))
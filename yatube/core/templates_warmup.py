@@ -0,0 +1,56 @@
+import logging
+import os
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('yatube.templates')
+
+
+def _loaders(engine):
+    for loader in engine.template_loaders:
+        # cached.Loader оборачивает настоящие загрузчики.
+        yield from getattr(loader, 'loaders', [loader])
+
+
+def template_names(engine, project_only=True):
+    """Имена всех шаблонов из каталогов загрузчиков движка."""
+    names = set()
+    for loader in _loaders(engine):
+        for directory in loader.get_dirs():
+            directory = str(directory)
+            if project_only and not directory.startswith(settings.BASE_DIR):
+                continue
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    names.add(os.path.relpath(
+                        os.path.join(root, filename), directory))
+    return sorted(names)
+
+
+def compile_templates(project_only=True):
+    """Разбирает все шаблоны; с cached-загрузчиком они остаются в памяти.
+
+    Возвращает число разобранных шаблонов и список (имя, ошибка).
+    """
+    compiled, errors = 0, []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine, project_only):
+            try:
+                backend.engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors.append((name, error))
+            else:
+                compiled += 1
+    return compiled, errors
+
+
+def warm_up():
+    """Вызывается при старте воркера: ошибки шаблонов сразу в лог."""
+    compiled, errors = compile_templates()
+    for name, error in errors:
+        logger.error('Шаблон %s не разбирается: %s', name, error)
+    return compiled
@@ -1,9 +1,23 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import fts_available, match_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Поиск в админке через FTS5-индекс вместо LIKE '%term%'."""
+    fts_table = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not fts_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        queryset = queryset.filter(
+            pk__in=match_ids(search_term, self.fts_table))
+        return queryset, False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,6 +27,7 @@ class PostAdmin(admin.ModelAdmin):
     )
     list_editable = ('group',)
     search_fields = ('text',)
+    fts_table = 'posts_post_fts'
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
@@ -22,10 +37,11 @@ class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('post', 'author', 'text', 'created')
     list_filter = ('author', 'post')
     search_fields = ('text', )
+    fts_table = 'posts_comment_fts'
 
 
 class FollowAdmin(admin.ModelAdmin):
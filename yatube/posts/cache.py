@@ -0,0 +1,207 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import partial, wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+CARD_TEMPLATE = 'includes/posts.html'
+CARD_TIMEOUT = 60 * 60 * 24
+PAGE_TIMEOUT = 60 * 60
+INDEX_PAGE_SCOPE = 'page:index'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def _digest(value):
+    # Slug и имя пользователя могут содержать символы, недопустимые
+    # в ключах memcached, - в ключ идёт их хеш.
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def group_page_scope(slug):
+    return f'page:group:{_digest(slug)}'
+
+
+def profile_page_scope(username):
+    return f'page:profile:{_digest(username)}'
+
+
+def post_page_scope(post_id):
+    return f'page:post:{post_id}'
+
+
+def _generation_key(scope):
+    return f'generation:{scope}'
+
+
+def get_generations(scopes):
+    """Возвращает текущие поколения для набора областей за один запрос.
+
+    Поколение - метка времени последнего изменения области. Если ключ
+    вытеснен из кеша, он заводится заново, что просто даёт промах.
+    """
+    keys = {_generation_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    generations = {keys[key]: value for key, value in found.items()}
+    now = time.time_ns()
+    for key, scope in keys.items():
+        if scope not in generations:
+            cache.add(key, now, None)
+            generations[scope] = cache.get(key, now)
+    return generations
+
+
+def _set_generations(scopes):
+    now = time.time_ns()
+    cache.set_many({_generation_key(scope): now for scope in scopes}, None)
+
+
+def bump_generations(*scopes):
+    """Сдвигает поколения областей после коммита текущей транзакции.
+
+    Сдвиг до коммита позволил бы параллельному запросу закешировать
+    старые строки уже под новым поколением.
+    """
+    if scopes:
+        transaction.on_commit(partial(_set_generations, scopes))
+
+
+def _card_scopes(post):
+    scopes = [author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def _card_key(post, generations):
+    versions = ':'.join(
+        str(generations[scope]) for scope in _card_scopes(post))
+    return f'post_card:{post.pk}:{post.updated_at.timestamp()}:{versions}'
+
+
+def render_post_cards(posts):
+    """Собирает карточки постов страницы из кеша, дорисовывая промахи."""
+    posts = list(posts)
+    generations = get_generations(
+        {scope for post in posts for scope in _card_scopes(post)})
+    keys = [_card_key(post, generations) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'post': post})
+            missing[key] = html
+        cards.append((post, mark_safe(html)))
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    return cards
+
+
+def drop_post_card(post):
+    if post.updated_at is None:
+        return
+    generations = get_generations(_card_scopes(post))
+    cache.delete(_card_key(post, generations))
+
+
+def cache_anonymous_page(get_scopes):
+    """Кеширует страницу целиком для анонимных GET-запросов.
+
+    get_scopes(**kwargs) возвращает области, от которых зависит страница.
+    Ключ включает полный URL (с курсором) и поколения этих областей,
+    поэтому сигналы сбрасывают ровно затронутые страницы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            scopes = sorted(get_scopes(**kwargs))
+            generations = get_generations(scopes)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            versions = ':'.join(str(generations[scope]) for scope in scopes)
+            key = f'page:{path}:{versions}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response['Content-Type']),
+                          PAGE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(get_scopes):
+    """Conditional GET по поколениям областей страницы.
+
+    ETag и Last-Modified считаются из поколений в кеше, поэтому 304
+    отдаётся до основных запросов и рендера. Для авторизованных в ETag
+    входят id пользователя, сессия и CSRF-токен: страница содержит его
+    кнопки и формы, а после повторного входа токен в формах другой.
+    Last-Modified авторизованным не отдаётся - по одной дате смену
+    токена не увидеть. get_scopes(**kwargs) может вернуть None - тогда
+    проверки нет.
+    """
+    def generations(request, kwargs):
+        if not hasattr(request, '_page_generations'):
+            scopes = get_scopes(**kwargs)
+            request._page_generations = (
+                None if scopes is None else get_generations(scopes))
+        return request._page_generations
+
+    def etag(request, *args, **kwargs):
+        found = generations(request, kwargs)
+        if not found:
+            return None
+        viewer = '-'
+        if request.user.is_authenticated:
+            viewer = ':'.join((str(request.user.pk),
+                               request.session.session_key or '',
+                               request.META.get('CSRF_COOKIE', '')))
+        versions = ':'.join(
+            f'{scope}={found[scope]}' for scope in sorted(found))
+        return hashlib.md5(f'{viewer}:{versions}'.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        found = generations(request, kwargs)
+        if not found:
+            return None
+        return datetime.fromtimestamp(
+            max(found.values()) / 10 ** 9, tz=timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, max_age=0)
+            else:
+                patch_cache_control(response, public=True, max_age=0)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .cache import bump_generations, profile_page_scope
+from .models import Follow, TimelineEntry, User
+from .stats import refresh_stats
+from .tasks import backfill_timelines
+
+GRAPH_TIMEOUT = 60 * 60 * 24
+
+
+def _graph_key(user_id):
+    return f'follow_graph:{user_id}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь.
+
+    Хранится в кеше целиком и сбрасывается сигналами Follow, поэтому
+    проверка «подписан ли» на странице профиля не ходит в БД.
+    """
+    key = _graph_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects
+                        .filter(user_id=user_id)
+                        .values_list('author_id', flat=True))
+        cache.set(key, ids, GRAPH_TIMEOUT)
+    return ids
+
+
+def is_following(user_id, author_id):
+    return author_id in following_ids(user_id)
+
+
+def _delete_graphs(user_ids):
+    cache.delete_many([_graph_key(user_id) for user_id in user_ids])
+
+
+def invalidate(*user_ids):
+    """Сбрасывает кеш подписок после коммита: иначе параллельный запрос
+    успеет положить в кеш старое множество на GRAPH_TIMEOUT."""
+    if user_ids:
+        transaction.on_commit(partial(_delete_graphs, user_ids))
+
+
+def follow(user_id, author_id):
+    """Подписка одним INSERT; повторная упирается в unique_follow."""
+    if user_id == author_id:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user_id, author_username):
+    """Отписка одним DELETE, без отдельной загрузки автора."""
+    deleted, _ = Follow.objects.filter(
+        user_id=user_id, author__username=author_username).delete()
+    return bool(deleted)
+
+
+def replace_following(user_id, author_ids):
+    """Заменяет подписки пользователя списком author_ids.
+
+    Новые подписки пишутся одним bulk_create, лишние удаляются одним
+    DELETE ... IN. Сигналы Follow при этом не срабатывают, поэтому их
+    работа - лента, счётчики, кеши - делается здесь сразу для всей пачки.
+    """
+    target = set(author_ids) - {user_id}
+    with transaction.atomic():
+        current = set(Follow.objects
+                      .filter(user_id=user_id)
+                      .values_list('author_id', flat=True))
+        added = sorted(target - current)
+        removed = sorted(current - target)
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for author_id in added],
+            ignore_conflicts=True)
+        if removed:
+            rows = Follow.objects.filter(
+                user_id=user_id, author_id__in=removed)
+            rows._raw_delete(rows.db)
+            TimelineEntry.objects.filter(
+                user_id=user_id, author_id__in=removed).delete()
+        if added or removed:
+            refresh_stats([user_id, *added, *removed])
+        if added:
+            transaction.on_commit(
+                partial(backfill_timelines.delay, user_id, added))
+    invalidate(user_id)
+    if added or removed:
+        usernames = User.objects.filter(
+            pk__in=[user_id, *added, *removed]).values_list(
+                'username', flat=True)
+        bump_generations(
+            *[profile_page_scope(username) for username in usernames])
+    return added, removed
@@ -1,12 +1,26 @@
 from django import forms
 
+from .images import inspect_upload, normalize_image
 from .models import Post, Comment
 
 
+class NormalizedImageField(forms.ImageField):
+    """Картинка проверяется по заголовку до полного декодирования,
+    затем уменьшается и пережимается без метаданных."""
+
+    def to_python(self, data):
+        upload = forms.FileField.to_python(self, data)
+        if upload is None:
+            return None
+        inspect_upload(upload)
+        return normalize_image(super().to_python(data))
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
+        field_classes = {'image': NormalizedImageField}
 
         labels = {
             "image": "Изображение",
@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def _target_format():
+    if features.check('webp'):
+        return 'WEBP', 'webp', 'image/webp'
+    return 'JPEG', 'jpg', 'image/jpeg'
+
+
+def inspect_upload(upload):
+    """Проверяет формат и размеры по заголовку, не декодируя картинку.
+
+    Image.open читает только заголовок, поэтому «бомбы» (маленький файл,
+    огромное разрешение) отсекаются до выделения памяти под пиксели.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError('Файл слишком большой.')
+    position = upload.tell()
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ValidationError('Слишком большое разрешение изображения.')
+    except Exception:
+        raise ValidationError('Загрузите корректное изображение.')
+    finally:
+        upload.seek(position)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(f'Формат {image_format} не поддерживается.')
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком большое разрешение изображения.')
+    return image_format, (width, height)
+
+
+def normalize_image(upload):
+    """Уменьшает картинку до лимита, убирает метаданные и пережимает.
+
+    EXIF-поворот применяется к пикселям, сами метаданные при повторном
+    кодировании не сохраняются. У анимированных GIF остаётся первый кадр.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    image_format, extension, content_type = _target_format()
+    with Image.open(upload) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if has_alpha and image_format == 'JPEG':
+            image_format, extension, content_type = 'PNG', 'png', 'image/png'
+        buffer = BytesIO()
+        image.save(buffer, image_format,
+                   quality=settings.POST_IMAGE_QUALITY, optimize=True)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        f'{name}.{extension}', buffer.getvalue(), content_type=content_type)
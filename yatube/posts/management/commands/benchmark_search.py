@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.test import RequestFactory
+
+from posts import search
+from posts.models import Post
+from posts.views import COUNT_POSTS_ON_PAGE
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск через FTS5 с поиском через LIKE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _measure(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2] * 1000
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError('FTS5-индекс поддерживается только в SQLite')
+        factory = RequestFactory()
+        repeat = options['repeat']
+        self.stdout.write(f'{"запрос":<20} {"LIKE, мс":>10} {"FTS5, мс":>10}')
+        for query in options['queries']:
+            request = factory.get('/search/', {'q': query})
+
+            def like():
+                list(Post.objects.filter(
+                    Q(text__icontains=query)
+                    | Q(comments__text__icontains=query)
+                ).distinct()[:COUNT_POSTS_ON_PAGE])
+
+            def fts():
+                search.search_posts(request, query, COUNT_POSTS_ON_PAGE)
+
+            like_ms = self._measure(repeat, like)
+            fts_ms = self._measure(repeat, fts)
+            self.stdout.write(f'{query:<20} {like_ms:>10.2f} {fts_ms:>10.2f}')
@@ -0,0 +1,151 @@
+import multiprocessing
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+from posts.models import Comment, Post, User
+from yatube.celery import app as celery_app
+
+MARKER = 'benchmark_sqlite_writes'
+PROFILES = {
+    'default': {
+        'SQLITE_PRAGMAS': {},
+        'SQLITE_IMMEDIATE_TRANSACTIONS': False,
+        'SQLITE_SERIALIZE_WRITES': False,
+    },
+    'production': {
+        'SQLITE_PRAGMAS': settings.SQLITE_PRODUCTION_PRAGMAS,
+        'SQLITE_IMMEDIATE_TRANSACTIONS': True,
+        'SQLITE_SERIALIZE_WRITES': True,
+    },
+}
+
+
+def add_comment(rng, post_ids, user_ids):
+    # Как add_comment с ATOMIC_REQUESTS: чтение и запись в одной транзакции.
+    with transaction.atomic():
+        post = Post.objects.filter(pk=rng.choice(post_ids)).first()
+        Comment.objects.create(
+            post=post, author_id=rng.choice(user_ids), text=MARKER)
+
+
+def post_create(rng, post_ids, user_ids):
+    Post.objects.create(author_id=rng.choice(user_ids), text=MARKER)
+
+
+OPERATIONS = (add_comment, post_create)
+
+
+def run_thread(seed, operations, post_ids, user_ids, results):
+    rng = random.Random(seed)
+    timings, errors = [], 0
+    for _ in range(operations):
+        operation = rng.choice(OPERATIONS)
+        started = time.perf_counter()
+        try:
+            operation(rng, post_ids, user_ids)
+        except OperationalError:
+            errors += 1
+        else:
+            timings.append(time.perf_counter() - started)
+    connections.close_all()
+    results.append((timings, errors))
+
+
+def run_process(profile, seed, threads, operations, post_ids, user_ids,
+                queue):
+    for name, value in PROFILES[profile].items():
+        setattr(settings, name, value)
+    celery_app.conf.task_always_eager = True
+    results = []
+    workers = [
+        threading.Thread(target=run_thread, args=(
+            seed * 1000 + number, operations, post_ids, user_ids, results))
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put(results)
+
+
+class Command(BaseCommand):
+    help = ('Параллельная запись в SQLite из нескольких процессов: '
+            'профиль по умолчанию против боевого (WAL, PRAGMA, очередь)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=100,
+                            help='Операций на поток')
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            choices=PROFILES)
+
+    def _journal_mode(self, mode=None):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            if mode:
+                cursor.execute(f'PRAGMA journal_mode = {mode}')
+            else:
+                cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def _run(self, profile, options, post_ids, user_ids):
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [
+            context.Process(target=run_process, args=(
+                profile, number, options['threads'], options['operations'],
+                post_ids, user_ids, queue))
+            for number in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        results = [item for _ in processes for item in queue.get()]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+        timings = sorted(t * 1000 for thread, _ in results for t in thread)
+        errors = sum(errors for _, errors in results)
+        done = len(timings)
+
+        def percentile(rank):
+            if not timings:
+                return 0
+            return timings[min(int(rank / 100 * done), done - 1)]
+
+        self.stdout.write(
+            f'{profile:<12} {done:>7} {errors:>7} {done / elapsed:>9.1f} '
+            f'{percentile(50):>8.1f} {percentile(95):>8.1f}')
+
+    def _cleanup(self):
+        Comment.objects.filter(text=MARKER).delete()
+        for post in Post.objects.filter(text=MARKER).iterator():
+            post.delete()
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite')
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError('Нет постов: запустите seed_yatube')
+        journal_mode = self._journal_mode()
+        self.stdout.write(
+            f'{"профиль":<12} {"готово":>7} {"ошибок":>7} {"оп/с":>9} '
+            f'{"p50, мс":>8} {"p95, мс":>8}')
+        celery_app.conf.task_always_eager = True
+        try:
+            for profile in options['profiles'] or PROFILES:
+                self._run(profile, options, post_ids, user_ids)
+                self._cleanup()
+                self._journal_mode(journal_mode)
+        finally:
+            connections.close_all()
@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+
+from posts.images import normalize_image
+from posts.thumbnails import RENDITIONS
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объём и время нарезки превью для исходных '
+            'и нормализованных картинок из каталога')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _thumbnail_ms(self, content, repeat):
+        width, height = RENDITIONS['card']['size']
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with Image.open(SimpleUploadedFile('image', content)) as image:
+                ImageOps.fit(image.convert('RGB'), (width, height),
+                             Image.LANCZOS)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2] * 1000
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'Нет каталога {directory}')
+        repeat = options['repeat']
+        totals = [0, 0, 0.0, 0.0]
+        self.stdout.write(f'{"файл":<30} {"КБ до":>8} {"КБ после":>8} '
+                          f'{"мс до":>8} {"мс после":>8}')
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as source:
+                original = source.read()
+            try:
+                normalized = normalize_image(
+                    SimpleUploadedFile(name, original)).read()
+            except OSError:
+                continue
+            row = [len(original), len(normalized),
+                   self._thumbnail_ms(original, repeat),
+                   self._thumbnail_ms(normalized, repeat)]
+            totals = [total + value for total, value in zip(totals, row)]
+            self.stdout.write(
+                f'{name[:30]:<30} {row[0] / 1024:>8.0f} {row[1] / 1024:>8.0f} '
+                f'{row[2]:>8.1f} {row[3]:>8.1f}')
+        if totals[0]:
+            self.stdout.write(
+                f'{"итого":<30} {totals[0] / 1024:>8.0f} '
+                f'{totals[1] / 1024:>8.0f} {totals[2]:>8.1f} '
+                f'{totals[3]:>8.1f}\n'
+                f'экономия места: {1 - totals[1] / totals[0]:.0%}')
@@ -0,0 +1,209 @@
+import json
+import math
+import random
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from core.query_budget import QueryCounter
+from posts.models import AuthorStats, Group, Post, User
+from yatube.celery import app as celery_app
+
+SCENARIOS = ('index', 'group_list', 'profile', 'post_detail',
+             'follow_index', 'post_create', 'add_comment')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, rank):
+    """Перцентиль методом ближайшего ранга."""
+    index = max(math.ceil(rank / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True, cwd=settings.BASE_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон основных страниц через WSGI-приложение: '
+            'p50/p95/p99, запросы к БД и пропускная способность в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--scenario', action='append',
+                            choices=SCENARIOS, dest='scenarios')
+        parser.add_argument('--username',
+                            help='От чьего имени ходить (по умолчанию '
+                                 'пользователь с наибольшим числом подписок)')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Читающие сценарии без авторизации')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def _user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            stats = (AuthorStats.objects.select_related('user')
+                     .order_by('-following_count').first())
+            user = stats.user if stats else User.objects.first()
+        if user is None:
+            raise CommandError('В базе нет пользователей: запустите '
+                               'seed_yatube')
+        return user
+
+    def _cookies(self, user):
+        client = Client()
+        client.force_login(user)
+        request = HttpRequest()
+        token = get_token(request)
+        cookies = {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+            settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+        }
+        return '; '.join(f'{key}={value}' for key, value in cookies.items()), \
+            token
+
+    def _sample(self, queryset, field, size=1000):
+        values = list(queryset.order_by('?').values_list(field, flat=True)
+                      [:size])
+        if not values:
+            raise CommandError(f'Нет данных для выборки {field}')
+        return values
+
+    def _requests(self, name, anonymous):
+        """Генератор (метод, путь, данные, нужна ли авторизация)."""
+        choice = self.random.choice
+        if name == 'index':
+            return lambda: ('get', reverse('posts:index'), None, not anonymous)
+        if name == 'group_list':
+            slugs = self._sample(Group.objects, 'slug')
+            return lambda: ('get', reverse(
+                'posts:group_list', args=[choice(slugs)]), None,
+                not anonymous)
+        if name == 'profile':
+            usernames = self._sample(
+                User.objects.filter(stats__posts_count__gt=0), 'username')
+            return lambda: ('get', reverse(
+                'posts:profile', args=[choice(usernames)]), None,
+                not anonymous)
+        post_ids = self._sample(Post.objects, 'pk')
+        if name == 'post_detail':
+            return lambda: ('get', reverse(
+                'posts:post_detail', args=[choice(post_ids)]), None,
+                not anonymous)
+        if name == 'follow_index':
+            return lambda: ('get', reverse('posts:follow_index'), None, True)
+        group_ids = self._sample(Group.objects, 'pk')
+        if name == 'post_create':
+            return lambda: ('post', reverse('posts:post_create'), {
+                'text': f'Нагрузочный пост {self.random.random()}',
+                'group': choice(group_ids),
+            }, True)
+        return lambda: ('post', reverse(
+            'posts:add_comment', args=[choice(post_ids)]),
+            {'text': 'Нагрузочный комментарий'}, True)
+
+    def _call(self, method, path, data, authorized):
+        factory_method = getattr(self.factory, method)
+        extra = {}
+        if authorized:
+            extra = {'HTTP_COOKIE': self.cookie,
+                     'HTTP_X_CSRFTOKEN': self.csrf_token}
+        environ = factory_method(path, data or {}, **extra).environ
+        status = []
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            result = self.application(
+                environ, lambda code, headers, *args: status.append(code))
+            size = sum(len(chunk) for chunk in result)
+            if hasattr(result, 'close'):
+                result.close()
+        elapsed = time.perf_counter() - started
+        return elapsed, counter.count, size, int(status[0].split()[0])
+
+    def _run(self, name, options):
+        make_request = self._requests(name, options['anonymous'])
+        for _ in range(options['warmup']):
+            self._call(*make_request())
+        timings, queries, sizes, errors = [], [], [], 0
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            elapsed, count, size, status = self._call(*make_request())
+            timings.append(elapsed * 1000)
+            queries.append(count)
+            sizes.append(size)
+            errors += status >= 400
+        total = time.perf_counter() - started
+        timings.sort()
+        result = {
+            'requests': len(timings),
+            'errors': errors,
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'bytes_per_request': round(sum(sizes) / len(sizes)),
+            'throughput_rps': round(len(timings) / total, 1),
+        }
+        for rank in PERCENTILES:
+            result[f'p{rank}_ms'] = round(percentile(timings, rank), 2)
+        return result
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        # Без брокера задачи (раскладка по лентам, миниатюры)
+        # выполняются в том же процессе и входят во время запроса.
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        try:
+            self._benchmark(options)
+        finally:
+            celery_app.conf.task_always_eager = eager
+
+    def _benchmark(self, options):
+        self.random = random.Random(options['seed'])
+        self.factory = RequestFactory()
+        self.application = get_wsgi_application()
+        user = self._user(options['username'])
+        self.cookie, self.csrf_token = self._cookies(user)
+        report = {
+            'commit': git_commit(),
+            'started': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.username,
+            'anonymous': options['anonymous'],
+            'scenarios': {},
+        }
+        self.stdout.write(
+            f'{"сценарий":<14} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"запросов":>9} {"rps":>8} {"ошибок":>7}')
+        for name in options['scenarios'] or SCENARIOS:
+            result = self._run(name, options)
+            report['scenarios'][name] = result
+            self.stdout.write(
+                f'{name:<14} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f}'
+                f' {result["p99_ms"]:>8.1f}'
+                f' {result["queries_per_request"]:>9.1f}'
+                f' {result["throughput_rps"]:>8.1f} {result["errors"]:>7}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.tasks import render_post_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Генерирует миниатюры для всех постов с картинками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--async', action='store_true', dest='use_celery',
+            help='Поставить задачи в очередь Celery вместо генерации на месте')
+
+    def handle(self, *args, **options):
+        post_ids = (Post.objects
+                    .exclude(image='')
+                    .order_by('pk')
+                    .values_list('pk', flat=True))
+        total = 0
+        for post_id in post_ids.iterator():
+            if options['use_celery']:
+                render_post_thumbnails.delay(post_id)
+            else:
+                render_post_thumbnails(post_id)
+            total += 1
+        self.stdout.write(f'Обработано постов: {total}')
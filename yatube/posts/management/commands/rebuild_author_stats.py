@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import refresh_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики авторов (AuthorStats) с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        fixed = total = 0
+        while True:
+            batch = list(user_ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            fixed += refresh_stats(batch)
+            total += len(batch)
+            last_id = batch[-1]
+        self.stdout.write(
+            f'Пересчитано авторов: {total}, исправлено: {fixed}')
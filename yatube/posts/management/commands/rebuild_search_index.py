@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс постов и комментариев (FTS5)'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError('FTS5-индекс поддерживается только в SQLite')
+        search.rebuild()
+        self.stdout.write('Индекс поиска перестроен')
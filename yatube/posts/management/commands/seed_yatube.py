@@ -0,0 +1,195 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, features
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+WORDS = ('байкал озеро лес горы река поход закат утро город дорога '
+         'море небо поезд книга кофе друзья дом сад зима лето').split()
+SEED_PASSWORD = 'seed-password'
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил наши даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками (степенное распределение)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя')
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона популярности авторов')
+        parser.add_argument(
+            '--images', type=float, default=0.2,
+            help='Доля постов с картинкой')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _log(self, message):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+    def _text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def _date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 86400))
+
+    def _bulk(self, model, objects, **kwargs):
+        """bulk_create пачками, не держа весь генератор в памяти."""
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, **kwargs)
+
+    def _new_ids(self, model, last_id):
+        return list(model.objects.filter(pk__gt=last_id)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def _last_id(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+    def _make_images(self, count=16):
+        image_format, extension = (
+            ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg'))
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', (1280, 720), tuple(
+                self.random.randrange(256) for _ in range(3)))
+            buffer = BytesIO()
+            image.save(buffer, image_format)
+            names.append(default_storage.save(
+                f'posts/seed_{number}.{extension}',
+                ContentFile(buffer.getvalue())))
+        return names
+
+    def _users(self, count, prefix):
+        password = make_password(SEED_PASSWORD)
+        for number in range(count):
+            yield User(username=f'{prefix}{number}', password=password,
+                       first_name='Сид', last_name=str(number),
+                       date_joined=self.now)
+
+    def _follows(self, user_ids, mean):
+        """Популярность автора ~ 1 / rank^alpha, число подписок случайно."""
+        weights = list(accumulate(
+            1 / rank ** self.alpha for rank in range(1, len(user_ids) + 1)))
+        authors = user_ids[:]
+        self.random.shuffle(authors)
+        for user_id in user_ids:
+            wanted = min(int(self.random.expovariate(1 / mean)) + 1,
+                         len(authors) - 1)
+            chosen = set(self.random.choices(
+                authors, cum_weights=weights, k=wanted))
+            chosen.discard(user_id)
+            for author_id in chosen:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def handle(self, *args, **options):
+        self.started = time.perf_counter()
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.days = options['days']
+        self.alpha = options['alpha']
+        self.now = timezone.now()
+        prefix = f'seed{int(time.time())}_'
+
+        last_user_id = self._last_id(User)
+        self._bulk(User, self._users(options['users'], prefix))
+        user_ids = self._new_ids(User, last_user_id)
+        self._log(f'пользователей: {len(user_ids)}')
+
+        last_group_id = self._last_id(Group)
+        self._bulk(Group, (
+            Group(title=f'Группа {number}', slug=f'{prefix}{number}',
+                  description=self._text(12))
+            for number in range(options['groups'])))
+        group_ids = self._new_ids(Group, last_group_id)
+        self._log(f'групп: {len(group_ids)}')
+
+        images = self._make_images() if options['images'] else []
+        # Посты тоже распределены по авторам неравномерно.
+        author_weights = [1 / rank ** self.alpha
+                          for rank in range(1, len(user_ids) + 1)]
+        last_post_id = self._last_id(Post)
+        with manual_dates(Post._meta.get_field('pub_date')):
+            self._bulk(Post, (
+                Post(author_id=author_id,
+                     group_id=(self.random.choice(group_ids)
+                               if group_ids and self.random.random() < 0.7
+                               else None),
+                     text=self._text(self.random.randint(5, 60)),
+                     image=(self.random.choice(images)
+                            if images
+                            and self.random.random() < options['images']
+                            else ''),
+                     pub_date=self._date())
+                for author_id in self.random.choices(
+                    user_ids, author_weights, k=options['posts'])))
+        post_ids = self._new_ids(Post, last_post_id)
+        self._log(f'постов: {len(post_ids)}')
+
+        with manual_dates(Comment._meta.get_field('created')):
+            self._bulk(Comment, (
+                Comment(post_id=self.random.choice(post_ids),
+                        author_id=self.random.choice(user_ids),
+                        text=self._text(self.random.randint(3, 20)),
+                        created=self._date())
+                for _ in range(options['comments'] if post_ids else 0)))
+        self._log(f'комментариев: {options["comments"]}')
+
+        self._bulk(Follow, self._follows(user_ids, options['follows']),
+                   ignore_conflicts=True)
+        self._log('подписки созданы')
+
+        # bulk_create не шлёт сигналы: ленты и счётчики строим отдельно.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TimelineEntry._meta.db_table} '
+                '(user_id, post_id, author_id, pub_date) '
+                'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+                f'FROM {Follow._meta.db_table} f '
+                f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+                'WHERE f.user_id > %s',
+                [last_user_id])
+        self._log('ленты подписок заполнены')
+        call_command('rebuild_author_stats', stdout=self.stdout)
+        cache.clear()
+        self._log(f'готово, пароль пользователей: {SEED_PASSWORD}')
@@ -0,0 +1,175 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from core.paginator import (NEXT, PREVIOUS, CursorPage, decode_cursor,
+                            encode_cursor, get_cursor_page)
+
+from .models import Post
+
+MAX_TERMS = 10
+COMMENT_WEIGHT = 0.5
+
+# Внешние (content=) FTS5-таблицы: текст хранится только в posts_post и
+# posts_comment, индекс синхронизируют триггеры. Перестройка таблицы
+# миграцией (AlterField в SQLite) удаляет триггеры - после таких миграций
+# нужно запускать rebuild_search_index.
+FTS_TABLES = {
+    'posts_post_fts': 'posts_post',
+    'posts_comment_fts': 'posts_comment',
+}
+
+CREATE_SQL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+        text, content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table}
+    BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS {fts}_ai',
+    'DROP TRIGGER IF EXISTS {fts}_ad',
+    'DROP TRIGGER IF EXISTS {fts}_au',
+    'DROP TABLE IF EXISTS {fts}',
+)
+
+RANKED_SQL = """
+SELECT post_id, MIN(score) AS score FROM (
+    SELECT rowid AS post_id, bm25(posts_post_fts) AS score
+    FROM posts_post_fts WHERE posts_post_fts MATCH %s
+    UNION ALL
+    SELECT c.post_id, bm25(posts_comment_fts) * {comment_weight}
+    FROM posts_comment_fts
+    JOIN posts_comment c ON c.id = posts_comment_fts.rowid
+    WHERE posts_comment_fts MATCH %s
+)
+GROUP BY post_id
+{having}
+ORDER BY score {order}, post_id {order}
+LIMIT %s
+"""
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def _statements(templates):
+    for fts, table in FTS_TABLES.items():
+        for template in templates:
+            yield template.format(fts=fts, table=table)
+
+
+def install(db=connection):
+    with db.cursor() as cursor:
+        for statement in _statements(CREATE_SQL):
+            cursor.execute(statement)
+
+
+def uninstall(db=connection):
+    with db.cursor() as cursor:
+        for statement in _statements(DROP_SQL):
+            cursor.execute(statement)
+
+
+def rebuild(db=connection):
+    install(db)
+    with db.cursor() as cursor:
+        for fts in FTS_TABLES:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def to_match_query(query):
+    """Превращает пользовательский ввод в безопасный MATCH-запрос FTS5.
+
+    Каждое слово берётся в кавычки (операторы FTS5 не интерпретируются)
+    и ищется по префиксу, слова объединяются через AND.
+    """
+    terms = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def match_ids(query, table):
+    """Подзапрос id строк, совпавших с запросом, для фильтра pk__in."""
+    return RawSQL(
+        f'SELECT rowid FROM {table} WHERE {table} MATCH %s',
+        [to_match_query(query)])
+
+
+def _ranked_rows(match, per_page, direction=None, key=None):
+    having = ''
+    params = [match, match]
+    order = 'ASC'
+    if direction == NEXT:
+        having = 'HAVING score > %s OR (score = %s AND post_id > %s)'
+        params += [key[0], key[0], key[1]]
+    elif direction == PREVIOUS:
+        having = 'HAVING score < %s OR (score = %s AND post_id < %s)'
+        params += [key[0], key[0], key[1]]
+        order = 'DESC'
+    sql = RANKED_SQL.format(
+        comment_weight=COMMENT_WEIGHT, having=having, order=order)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [per_page + 1])
+        return cursor.fetchall()
+
+
+def _parse_cursor(cursor):
+    decoded = decode_cursor(cursor)
+    if decoded is None:
+        return None, None
+    direction, values = decoded
+    try:
+        score, post_id = float(values[0]), int(values[1])
+    except (IndexError, ValueError):
+        return None, None
+    return direction, (score, post_id)
+
+
+def search_posts(request, query, per_page):
+    """Ранжированный поиск по текстам постов и комментариев.
+
+    Пагинация по ключу (bm25, id) в том же формате курсора, что и ленты.
+    """
+    params = {'q': query}
+    match = to_match_query(query)
+    if not match:
+        return CursorPage([], None, None, params=params)
+    if not fts_available():
+        posts = Post.objects.filter(
+            Q(text__icontains=query) | Q(comments__text__icontains=query)
+        ).distinct().select_related('author', 'group')
+        return get_cursor_page(request, posts, per_page)
+    cursor = request.GET.get('cursor')
+    direction, key = _parse_cursor(cursor)
+    rows = _ranked_rows(match, per_page, direction, key)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREVIOUS:
+        rows.reverse()
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _ in rows])
+    ranked = [posts[post_id] for post_id, _ in rows if post_id in posts]
+    next_cursor = previous_cursor = None
+    if rows and (has_more or direction == PREVIOUS):
+        post_id, score = rows[-1]
+        next_cursor = encode_cursor([score, post_id], NEXT)
+    if rows and (direction == NEXT or (direction == PREVIOUS and has_more)):
+        post_id, score = rows[0]
+        previous_cursor = encode_cursor([score, post_id], PREVIOUS)
+    return CursorPage(ranked, next_cursor, previous_cursor,
+                      cursor=cursor if direction else None, params=params)
@@ -0,0 +1,198 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (INDEX_PAGE_SCOPE, author_scope, bump_generations,
+                    drop_post_card, group_page_scope, group_scope,
+                    post_page_scope, profile_page_scope)
+from .follow_graph import invalidate as invalidate_graph
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .stats import bump
+from .tasks import backfill_timeline, fan_out_post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(fan_out_post.delay, instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(
+            backfill_timeline.delay, instance.user_id, instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    TimelineEntry.objects.filter(
+        user_id=instance.user_id,
+        author_id=instance.author_id).delete()
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    bump(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'followers_count', 1)
+        bump(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    bump(instance.author_id, 'followers_count', -1)
+    bump(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post_card(sender, instance, **kwargs):
+    drop_post_card(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_cards(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_generations(author_scope(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_generations(group_scope(instance.pk))
+
+
+def _previous_value(model, instance, field):
+    if instance.pk is None:
+        return None
+    return (model.objects
+            .filter(pk=instance.pk)
+            .values_list(field, flat=True)
+            .first())
+
+
+def _group_page_scopes(**filters):
+    slugs = Group.objects.filter(**filters).values_list('slug', flat=True)
+    return [group_page_scope(slug) for slug in slugs.distinct()]
+
+
+def _profile_page_scopes(**filters):
+    usernames = User.objects.filter(**filters).values_list(
+        'username', flat=True)
+    return [profile_page_scope(username) for username in usernames.distinct()]
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._previous_group_id = _previous_value(Post, instance, 'group_id')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    group_ids = {instance.group_id, getattr(instance, '_previous_group_id',
+                                            None)} - {None}
+    bump_generations(
+        INDEX_PAGE_SCOPE,
+        post_page_scope(instance.pk),
+        *_profile_page_scopes(pk=instance.author_id),
+        *_group_page_scopes(pk__in=group_ids))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    bump_generations(post_page_scope(instance.post_id))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    instance._previous_username = _previous_value(User, instance, 'username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, update_fields=None,
+                            created=False, **kwargs):
+    # Новый пользователь ещё нигде не показан: регистрация и активация
+    # не должны сбрасывать кеш ленты.
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    usernames = {instance.username,
+                 getattr(instance, '_previous_username', None)} - {None}
+    scopes = [profile_page_scope(username) for username in usernames]
+    if Post.objects.filter(author_id=instance.pk).exists():
+        scopes += [INDEX_PAGE_SCOPE,
+                   *_group_page_scopes(posts__author=instance.pk)]
+    bump_generations(*scopes)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._previous_slug = _previous_value(Group, instance, 'slug')
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group_pages(sender, instance, **kwargs):
+    previous_slug = getattr(instance, '_previous_slug', None)
+    scopes = [group_page_scope(instance.slug)]
+    if previous_slug and previous_slug != instance.slug:
+        scopes += [group_page_scope(previous_slug), INDEX_PAGE_SCOPE]
+        scopes += _profile_page_scopes(posts__group=instance.pk)
+    bump_generations(*scopes)
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_pages(sender, instance, **kwargs):
+    bump_generations(
+        group_page_scope(instance.slug),
+        INDEX_PAGE_SCOPE,
+        *_profile_page_scopes(posts__group=instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    bump_generations(*_profile_page_scopes(
+        pk__in=[instance.user_id, instance.author_id]))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph(sender, instance, **kwargs):
+    invalidate_graph(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_new_user_graph(sender, instance, created, **kwargs):
+    # SQLite может выдать новому пользователю id удалённого.
+    if created:
+        invalidate_graph(instance.pk)
@@ -0,0 +1,82 @@
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'comments_count': (Comment, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def count_stats(user_ids):
+    """Считает все счётчики для пачки пользователей заново."""
+    stats = {
+        user_id: AuthorStats(user_id=user_id) for user_id in user_ids
+    }
+    for field, (model, column) in COUNTERS.items():
+        rows = (model.objects
+                .filter(**{f'{column}__in': user_ids})
+                # Иначе ordering модели (-pub_date) попадёт в GROUP BY.
+                .order_by()
+                .values(column)
+                .annotate(total=Count('pk'))
+                .values_list(column, 'total'))
+        for user_id, total in rows:
+            setattr(stats[user_id], field, total)
+    return stats
+
+
+def refresh_stats(user_ids):
+    """Пересчитывает и сохраняет счётчики пачки пользователей.
+
+    Возвращает число существовавших строк, которые пришлось исправить.
+    """
+    if not user_ids:
+        return 0
+    counted = count_stats(user_ids)
+    existing = AuthorStats.objects.in_bulk(user_ids)
+    changed = [
+        stats for user_id, stats in counted.items()
+        if user_id in existing and any(
+            getattr(stats, field) != getattr(existing[user_id], field)
+            for field in COUNTERS)
+    ]
+    missing = [
+        stats for user_id, stats in counted.items()
+        if user_id not in existing
+    ]
+    AuthorStats.objects.bulk_update(changed, list(COUNTERS))
+    AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(changed)
+
+
+def create_stats(user_id):
+    counted = count_stats([user_id])[user_id]
+    stats, _ = AuthorStats.objects.get_or_create(
+        user_id=user_id,
+        defaults={field: getattr(counted, field) for field in COUNTERS})
+    return stats
+
+
+def bump(user_id, field, delta):
+    """Атомарно сдвигает счётчик.
+
+    Если строки ещё нет, она создаётся с посчитанными значениями, которые
+    уже учитывают только что сохранённый объект. При удалении строку не
+    создаём: пользователь может как раз удаляться каскадом.
+    """
+    rows = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    updated = rows.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        create_stats(user_id)
+
+
+def get_author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return create_stats(user.pk)
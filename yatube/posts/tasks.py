@@ -0,0 +1,91 @@
+from yatube.celery import app
+
+from .models import Follow, Post, TimelineEntry
+from .thumbnails import generate_thumbnails
+
+FAN_OUT_BATCH_SIZE = 1000
+
+
+@app.task
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора пачками."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return 0
+    followers = (Follow.objects
+                 .filter(author_id=post['author_id'])
+                 .values_list('user_id', flat=True)
+                 .order_by('user_id'))
+    last_user_id = 0
+    total = 0
+    while True:
+        batch = list(
+            followers.filter(user_id__gt=last_user_id)[:FAN_OUT_BATCH_SIZE])
+        if not batch:
+            return total
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id,
+                           author_id=post['author_id'],
+                           pub_date=post['pub_date'])
+             for user_id in batch],
+            ignore_conflicts=True)
+        total += len(batch)
+        last_user_id = batch[-1]
+
+
+def _prune_unfollowed(user_id, author_id):
+    """Удаляет посты автора из ленты, если подписки уже нет.
+
+    Отписка могла случиться, пока задача ждала в очереди или шла:
+    prune_timeline тогда отработал раньше, чем мы дописали ленту.
+    """
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        return False
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+    return True
+
+
+@app.task
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту нового подписчика все посты автора."""
+    posts = (Post.objects
+             .filter(author_id=author_id)
+             .values_list('pk', 'pub_date')
+             .order_by('pk'))
+    last_post_id = 0
+    total = 0
+    while True:
+        if _prune_unfollowed(user_id, author_id):
+            return 0
+        batch = list(posts.filter(pk__gt=last_post_id)[:FAN_OUT_BATCH_SIZE])
+        if not batch:
+            return total
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id,
+                           author_id=author_id, pub_date=pub_date)
+             for post_id, pub_date in batch],
+            ignore_conflicts=True)
+        total += len(batch)
+        last_post_id = batch[-1][0]
+
+
+@app.task
+def backfill_timelines(user_id, author_ids):
+    """Добавляет в ленту посты нескольких авторов (массовая подписка)."""
+    return sum(backfill_timeline(user_id, author_id)
+               for author_id in author_ids)
+
+
+@app.task
+def render_post_thumbnails(post_id):
+    """Заранее рендерит все миниатюры картинки поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return False
+    generate_thumbnails(post.image)
+    # Новая updated_at сбрасывает закешированные карточки и страницы,
+    # в которых вместо картинки ещё стоит заглушка.
+    post.save(update_fields=['updated_at'])
+    return True
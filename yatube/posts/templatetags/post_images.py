@@ -0,0 +1,32 @@
+from django import template
+
+from ..thumbnails import RENDITIONS, get_ready_renditions
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(image, name='card', css_class='card-img my-2'):
+    """<img srcset> из готовых миниатюр или заглушка, пока их нет."""
+    rendition = RENDITIONS[name]
+    thumbnails = get_ready_renditions(image, name)
+    width, height = rendition['size']
+    context = {
+        'image': image,
+        'css_class': css_class,
+        'width': width,
+        'height': height,
+        'sizes': rendition['sizes'],
+        'src': None,
+    }
+    if thumbnails:
+        # src - ширина по умолчанию, остальные браузер выберет сам.
+        default = min(thumbnails, key=lambda thumb: abs(thumb.width - width))
+        context.update(
+            src=default.url,
+            width=default.width,
+            height=default.height,
+            srcset=', '.join(
+                f'{thumb.url} {thumb.width}w' for thumb in thumbnails),
+        )
+    return context
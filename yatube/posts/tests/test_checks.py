@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import shared_cache_check
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://127.0.0.1:6379/1'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    def test_local_cache_rejected_without_debug(self):
+        with override_settings(DEBUG=False, CACHES=LOCMEM):
+            errors = shared_cache_check(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    def test_local_cache_allowed_in_debug_and_shared_cache_passes(self):
+        with override_settings(DEBUG=True, CACHES=LOCMEM):
+            self.assertEqual(shared_cache_check(None), [])
+        with override_settings(DEBUG=False, CACHES=REDIS):
+            self.assertEqual(shared_cache_check(None), [])
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from yatube.celery import app as celery_app
+
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedAndBenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_builds_derived_data(self):
+        call_command('seed_yatube', users=30, groups=3, posts=200,
+                     comments=100, follows=5, batch_size=64,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(Post.objects.filter(author_id=author_id).count()
+                for author_id in Follow.objects.values_list(
+                    'author_id', flat=True)))
+        stats = AuthorStats.objects.order_by('-posts_count').first()
+        self.assertEqual(stats.posts_count,
+                         Post.objects.filter(author_id=stats.pk).count())
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1)
+
+    def test_benchmark_writes_report(self):
+        call_command('seed_yatube', users=10, groups=2, posts=30,
+                     comments=10, images=0, stdout=StringIO())
+        output = os.path.join(TEMP_MEDIA_ROOT, 'report.json')
+        call_command('benchmark_views', requests=3, warmup=1,
+                     output=output, stdout=StringIO())
+        self.assertFalse(celery_app.conf.task_always_eager)
+        with open(output, encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        for name, result in report['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 3)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
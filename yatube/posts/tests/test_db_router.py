@@ -0,0 +1,63 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db_router import (PIN_COOKIE, PrimaryReplicaRouter,
+                            ReplicaPinningMiddleware, read_from_replicas)
+
+from ..models import Post
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_use_replica_only_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with read_from_replicas():
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+    def _request(self, request, write=False):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+                seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen, response.cookies.get(PIN_COOKIE)
+
+    def test_safe_request_reads_from_replica(self):
+        seen, cookie = self._request(self.factory.get('/'))
+        self.assertEqual(seen, ['replica1'])
+        self.assertIsNone(cookie)
+
+    def test_write_request_pins_to_primary(self):
+        seen, cookie = self._request(self.factory.post('/create/'))
+        self.assertEqual(seen, ['default'])
+        self.assertIsNotNone(cookie)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        seen, _ = self._request(request)
+        self.assertEqual(seen, ['default'])
+
+    def test_write_in_get_pins_to_primary(self):
+        seen, cookie = self._request(self.factory.get('/follow/'), write=True)
+        self.assertEqual(seen, ['replica1', 'default'])
+        self.assertIsNotNone(cookie)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_nothing_changes(self):
+        seen, cookie = self._request(self.factory.post('/create/'))
+        self.assertEqual(seen, ['default'])
+        self.assertIsNone(cookie)
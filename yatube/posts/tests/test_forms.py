@@ -1,12 +1,15 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
+from ..forms import PostForm
 from ..models import Post, Group
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -89,3 +92,45 @@ class PostFormTest(TestCase):
         )
         self.assertEqual(Post.objects.get(id=1).text, 'Новый текст')
         self.assertEqual(Post.objects.get(id=1).group, self.group_second)
+
+
+def make_upload(size, image_format='JPEG', **save_kwargs):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format, **save_kwargs)
+    return SimpleUploadedFile(f'photo.{image_format.lower()}',
+                              buffer.getvalue())
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=100, POST_IMAGE_MAX_PIXELS=10_000)
+class ImageNormalizationTest(TestCase):
+    def _clean_image(self, upload):
+        form = PostForm(data={'text': 'Текст'}, files={'image': upload})
+        return form, form.is_valid() and form.cleaned_data['image']
+
+    def test_image_is_downscaled_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera'
+        form, image = self._clean_image(make_upload((80, 40), exif=exif))
+        self.assertTrue(form.is_valid(), form.errors)
+        with Image.open(image) as result:
+            self.assertEqual(result.size, (40, 80))
+            self.assertFalse(result.getexif())
+            self.assertEqual(result.format, 'WEBP')
+        self.assertTrue(image.name.endswith('.webp'))
+
+    def test_large_image_is_resized(self):
+        with self.settings(POST_IMAGE_MAX_PIXELS=1_000_000):
+            form, image = self._clean_image(make_upload((400, 200), 'PNG'))
+        self.assertTrue(form.is_valid(), form.errors)
+        with Image.open(image) as result:
+            self.assertEqual(result.size, (100, 50))
+
+    def test_too_many_pixels_rejected_from_header(self):
+        form, _ = self._clean_image(make_upload((200, 200)))
+        self.assertIn('image', form.errors)
+
+    def test_not_an_image_rejected(self):
+        form, _ = self._clean_image(
+            SimpleUploadedFile('photo.jpg', b'not an image'))
+        self.assertIn('image', form.errors)
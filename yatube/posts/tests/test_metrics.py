@@ -0,0 +1,58 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.metrics import collector
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тест')
+
+    def setUp(self):
+        cache.clear()
+        collector.reset()
+        self.client = Client()
+
+    def _metric(self, text, name, view):
+        match = re.search(
+            rf'^{name}{{view="{view}"}} ([\d.]+)$', text, re.MULTILINE)
+        self.assertIsNotNone(match, f'{name} для {view}')
+        return float(match.group(1))
+
+    def test_metrics_are_collected_per_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        response = self.client.get(reverse('metrics'))
+        text = response.content.decode()
+        self.assertEqual(
+            self._metric(text, 'yatube_requests_total', 'posts:index'), 2)
+        self.assertEqual(
+            self._metric(text, 'yatube_requests_total', 'posts:post_detail'),
+            1)
+        self.assertGreater(self._metric(
+            text, 'yatube_db_queries_total', 'posts:post_detail'), 0)
+        self.assertGreater(self._metric(
+            text, 'yatube_template_duration_seconds_total', 'posts:index'), 0)
+        self.assertGreater(self._metric(
+            text, 'yatube_response_bytes_total', 'posts:index'), 0)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text)
+
+    def test_metrics_only_for_internal_ips(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
+from ..stats import count_stats
 
 User = get_user_model()
 
@@ -60,3 +64,46 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).verbose_name, excepted_value
                 )
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def _stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_signals_keep_counters(self):
+        """Проверяем, что сигналы обновляют счётчики автора"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        author_stats = self._stats(self.author)
+        reader_stats = self._stats(self.reader)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        post.delete()
+        self.assertEqual(self._stats(self.author).posts_count, 0)
+        self.assertEqual(self._stats(self.reader).comments_count, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        """Проверяем, что команда пересчитывает счётчики с нуля"""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        self.assertEqual(self._stats(self.author).posts_count, 1)
+
+    def test_count_stats_groups_by_author_only(self):
+        """Проверяем, что несколько постов автора дают одну строку счёта"""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        for post in posts:
+            Comment.objects.create(post=post, author=self.reader, text='Ок')
+        stats = count_stats([self.author.pk, self.reader.pk])
+        self.assertEqual(stats[self.author.pk].posts_count, 3)
+        self.assertEqual(stats[self.reader.pk].comments_count, 3)
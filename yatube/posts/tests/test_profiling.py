@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import RequestProfile
+from core.profiling import StackSampler, make_profile_token
+
+from ..models import Post
+
+User = get_user_model()
+
+
+def busy_loop(seconds):
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        pass
+
+
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тест')
+        cls.url = reverse('posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def test_sampler_collects_collapsed_stacks(self):
+        sampler = StackSampler(threading.get_ident(), 0.001).start()
+        busy_loop(0.05)
+        stacks = sampler.stop()
+        self.assertTrue(stacks)
+        self.assertTrue(any(stack.split(';')[-1].startswith('busy_loop')
+                            for stack in stacks))
+
+    def test_signed_header_enables_profiling(self):
+        response = Client().get(self.url, HTTP_X_PROFILE=make_profile_token())
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.view_name, 'posts:post_detail')
+        Client().get(self.url, HTTP_X_PROFILE='forged')
+        Client().get(self.url)
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    def test_sample_rate(self):
+        Client().get(self.url)
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_export_merges_samples(self):
+        for stacks in ('a;b 2\na;c 1', 'a;b 3'):
+            RequestProfile.objects.create(
+                view_name='posts:post_detail', path=self.url,
+                duration=0.1, samples=3, stacks=stacks)
+        output_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        call_command('export_flamegraphs', output_dir, stdout=StringIO())
+        path = os.path.join(output_dir, 'posts_post_detail.folded')
+        with open(path, encoding='utf-8') as folded:
+            self.assertEqual(folded.read(), 'a;b 5\na;c 1\n')
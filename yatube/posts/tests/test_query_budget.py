@@ -0,0 +1,84 @@
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import QueryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post
+from ..tasks import backfill_timeline
+
+User = get_user_model()
+GROW_BY = 5
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='test', slug='test', description='test group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Байкал')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.batches = count()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def _add_posts(self):
+        batch = next(self.batches)
+        for number in range(GROW_BY):
+            name = f'{batch}_{number}'
+            author = User.objects.create_user(username=f'author{name}')
+            group = Group.objects.create(
+                title=name, slug=f'g{name}', description='-')
+            Post.objects.create(author=author, group=group,
+                                text=f'Байкал {number}')
+            Post.objects.create(author=self.user, group=group,
+                                text=f'Байкал {number}')
+        backfill_timeline(self.reader.pk, self.user.pk)
+
+    def _add_comments(self):
+        batch = next(self.batches)
+        for number in range(GROW_BY):
+            author = User.objects.create_user(
+                username=f'reader{batch}_{number}')
+            Comment.objects.create(
+                post=self.post, author=author, text=f'c{number}')
+
+    def test_post_lists(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            reverse('posts:search') + '?q=байкал',
+        ]
+        for url in urls:
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(url=url, client=client):
+                    self.assertQueryBudget(client, url, self._add_posts)
+
+    def test_follow_index(self):
+        self.assertQueryBudget(
+            self.authorized_client,
+            reverse('posts:follow_index'),
+            self._add_posts)
+
+    def test_post_detail_and_comments(self):
+        urls = [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(
+                    self.authorized_client, url, self._add_comments)
@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..tasks import backfill_timeline
+from ..views import COUNT_COMMENTS_ON_PAGE, COUNT_POSTS_ON_PAGE
+
+User = get_user_model()
+HOT_TABLES = ('posts_post', 'posts_comment', 'posts_timelineentry')
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+# Страница по курсору - диапазон по ключу в индексе, а не обход индекса
+# с начала ленты.
+KEYSET_SEEK = re.compile(r'"(pub_date|created)" [<>]')
+KEYSET_RANGE = re.compile(
+    r'^SEARCH .*USING (COVERING )?INDEX \w+ \(.*(pub_date|created)[<>]\?\)')
+
+
+class QueryPlanTest(TestCase):
+    """Горячие запросы лент не должны сканировать таблицу и сортировать."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='test', slug='test', description='test group')
+        for number in range(COUNT_POSTS_ON_PAGE * 2):
+            post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {number}')
+        for _ in range(COUNT_COMMENTS_ON_PAGE + 1):
+            Comment.objects.create(post=post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        backfill_timeline(cls.reader.pk, cls.user.pk)
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        pages = [response.context.get(name)
+                 for name in ('page_obj', 'comments')]
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(
+                    table in sql for table in HOT_TABLES):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+        for page in pages:
+            if page is not None and page.has_next():
+                yield from self._plans(
+                    url.partition('?')[0] + page.next_querystring)
+
+    def _assert_indexed(self, url):
+        for sql, plan in self._plans(url):
+            for detail in plan:
+                with self.subTest(url=url, sql=sql, detail=detail):
+                    self.assertNotIn('TEMP B-TREE', detail)
+                    self.assertIsNone(FULL_SCAN.match(detail))
+            if KEYSET_SEEK.search(sql):
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    self.assertTrue(any(KEYSET_RANGE.match(detail)
+                                        for detail in plan))
+
+    def test_feeds_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            self._assert_indexed(url)
+
+    def test_cursor_pages_keep_order_on_equal_dates(self):
+        Post.objects.filter(author=self.user).update(
+            pub_date=self.post.pub_date)
+        url = reverse('posts:profile', kwargs={'username': 'NoName'})
+        seen = []
+        while url:
+            response = self.client.get(url)
+            page_obj = response.context['page_obj']
+            seen += [post.pk for post in page_obj]
+            url = (reverse('posts:profile', kwargs={'username': 'NoName'})
+                   + page_obj.next_querystring
+                   if page_obj.has_next() else None)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(seen), COUNT_POSTS_ON_PAGE * 2)
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import MetricsMiddleware
+from core.models import SlowQuery
+from core.slow_queries import SlowQueryLogger, normalize_sql
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тест')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (1, 2,  3)\n"
+                          "AND name = 'it''s' AND x = %s LIMIT 10"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? '
+            'AND x = ? LIMIT ?')
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_grouped_with_plan(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            Client().get(url)
+            Client().get(url)
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=None):
+            entry = SlowQuery.objects.get(
+                normalized_sql__contains='"posts_authorstats"',
+                view_name='posts:post_detail')
+        self.assertEqual(entry.count, 2)
+        self.assertIn('posts_post', entry.plan)
+        self.assertGreaterEqual(entry.total_duration, entry.max_duration)
+        self.assertIn('views.py', entry.stack)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_replica_query_is_written_to_primary(self):
+        replica = SimpleNamespace(alias='replica1')
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            SlowQueryLogger(replica).record('UPDATE t SET x = 1', (), 0.5)
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=None):
+            self.assertTrue(SlowQuery.objects.using('default').filter(
+                normalized_sql='UPDATE t SET x = ?').exists())
+
+    def test_logger_outlives_request_wrappers(self):
+        wrappers = connection.execute_wrappers
+        self.addCleanup(setattr, connection, 'execute_wrappers', wrappers)
+        connection.execute_wrappers = []
+
+        def view(request):
+            # Тестовая база в памяти не закрывается: новое соединение
+            # после close_old_connections имитирует сигнал.
+            connection_created.send(sender=type(connection),
+                                    connection=connection)
+            Post.objects.count()
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(view)
+        for _ in range(3):
+            middleware(RequestFactory().get('/'))
+            close_old_connections()
+        self.assertEqual(
+            [type(wrapper) for wrapper in connection.execute_wrappers],
+            [SlowQueryLogger])
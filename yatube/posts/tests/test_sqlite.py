@@ -0,0 +1,82 @@
+import threading
+from types import SimpleNamespace
+
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.sqlite import _write_lock, configure_connection
+from yatube.celery import app as celery_app
+
+from ..models import Post, User
+
+
+class SqliteProfileTest(TestCase):
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        cache_size = self._pragma('cache_size')
+        with self.settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+            configure_connection(None, connection)
+        self.assertEqual(self._pragma('cache_size'), -1234)
+        with self.settings(SQLITE_PRAGMAS={'cache_size': cache_size}):
+            configure_connection(None, connection)
+
+
+@override_settings(SQLITE_IMMEDIATE_TRANSACTIONS=True,
+                   SQLITE_SERIALIZE_WRITES=True)
+class SerializedWritesTest(TransactionTestCase):
+    """Нужны настоящие BEGIN/COMMIT, поэтому без обёртки TestCase."""
+
+    def setUp(self):
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', eager)
+        configure_connection(None, connection)
+        self.addCleanup(self._restore_connection)
+
+    def _restore_connection(self):
+        for name in ('_commit', '_rollback', '_close',
+                     '_start_transaction_under_autocommit',
+                     'releases_write_lock', 'holds_write_lock'):
+            connection.__dict__.pop(name, None)
+
+    def _locked_elsewhere(self):
+        result = []
+
+        def probe():
+            acquired = _write_lock.acquire(blocking=False)
+            if acquired:
+                _write_lock.release()
+            result.append(not acquired)
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_transaction_holds_lock_until_commit(self):
+        user = User.objects.create_user(username='NoName')
+        self.assertFalse(self._locked_elsewhere())
+        with transaction.atomic():
+            self.assertTrue(self._locked_elsewhere())
+            Post.objects.create(author=user, text='Тест')
+            with transaction.atomic():
+                self.assertTrue(self._locked_elsewhere())
+        self.assertFalse(self._locked_elsewhere())
+        self.assertTrue(Post.objects.exists())
+
+    def test_replica_connection_is_not_patched(self):
+        replica = SimpleNamespace(alias='replica1', vendor='sqlite',
+                                  connection=connection.connection)
+        configure_connection(None, replica)
+        self.assertFalse(hasattr(
+            replica, '_start_transaction_under_autocommit'))
+
+    def test_rollback_releases_lock(self):
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                raise DatabaseError
+        self.assertFalse(self._locked_elsewhere())
@@ -0,0 +1,25 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class CompileTemplatesTest(SimpleTestCase):
+    def test_project_templates_compile(self):
+        output = StringIO()
+        call_command('compile_templates', stdout=output)
+        self.assertIn('Шаблонов разобрано', output.getvalue())
+
+    def test_broken_template_fails(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(f'{directory}/broken.html', 'w') as template:
+            template.write('{% if %}')
+        templates = [dict(settings.TEMPLATES[0], DIRS=[directory])]
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaises(CommandError):
+                call_command('compile_templates', stdout=StringIO(),
+                             stderr=StringIO())
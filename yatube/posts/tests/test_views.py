@@ -1,4 +1,5 @@
 import tempfile
+import warnings
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -7,9 +8,17 @@ from django.urls import reverse
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-
-from ..models import Group, Post, Follow
-from ..views import COUNT_POSTS_ON_PAGE
+from django.core.cache.backends.base import CacheKeyWarning
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..cache import (author_scope, get_generations, group_page_scope,
+                     profile_page_scope)
+from ..follow_graph import following_ids
+from ..models import AuthorStats, Comment, Group, Post, Follow, TimelineEntry
+from ..tasks import backfill_timeline, fan_out_post, render_post_thumbnails
+from ..views import COUNT_COMMENTS_ON_PAGE, COUNT_POSTS_ON_PAGE
+from .utils import run_on_commit
 
 User = get_user_model()
 COUNT_TEMP_POST = 13
@@ -113,6 +122,19 @@ class ViewsTests(TestCase):
         self.assertEqual(response.context['post'].text, 'Тестовый текст')
         self.assertEqual(response.context['post'].image, self.post.image)
 
+    def test_thumbnail_placeholder_until_rendered(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'img/placeholder.svg')
+        render_post_thumbnails(self.post.pk)
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, 'img/placeholder.svg')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+        srcset = response.content.decode().split('srcset="')[1].split('"')[0]
+        self.assertEqual(
+            [item.split()[1] for item in srcset.split(', ')],
+            ['480w', '960w', '1440w'])
+
     def _assert_post(self, response):
         form_fields = {
             'text': forms.fields.CharField,
@@ -158,7 +180,7 @@ class ViewsTests(TestCase):
             'posts:post_detail',
             kwargs={'post_id': 1}
         ))
-        count_comments = response.context['comments'].count()
+        count_comments = len(response.context['comments'])
         self.authorized_client.post(
             reverse('posts:add_comment', kwargs={'post_id': 1}),
             data={'text': 'Тестовый текст комментария'},
@@ -168,27 +190,80 @@ class ViewsTests(TestCase):
             'posts:post_detail',
             kwargs={'post_id': 1}
         ))
-        self.assertEqual(response.context['comments'].count(),
+        self.assertEqual(len(response.context['comments']),
                          count_comments + 1)
 
+    def test_comments_paginated_newest_first(self):
+        for number in range(COUNT_COMMENTS_ON_PAGE + 2):
+            Comment.objects.create(
+                post=self.post, author=self.user_second, text=f'c{number}')
+        response = self.authorized_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COUNT_COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, f'c{COUNT_COMMENTS_ON_PAGE + 1}')
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url + comments.next_querystring)
+        self.assertContains(response, 'c0')
+        self.assertNotContains(response, 'js-more-comments')
+        response = self.guest_client.get(
+            url, {'format': 'json'}).json()
+        self.assertEqual(len(response['comments']), COUNT_COMMENTS_ON_PAGE)
+        self.assertIsNotNone(response['next'])
+
     def test_cache_index_page(self):
+        cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
         index_content = response.content
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, index_content)
         form_data = {
-            'text': 'Тестовый текст',
+            'text': 'Только что опубликован',
             'group': self.group.id,
         }
-        self.authorized_client.post(
-            reverse('posts:post_create'),
-            data=form_data,
-            follow=True
-        )
+        with run_on_commit():
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data=form_data,
+                follow=True
+            )
         response = self.guest_client.get(reverse('posts:index'))
-        index_content_cache = response.content
-        self.assertEqual(index_content_cache, index_content)
+        self.assertContains(response, 'Только что опубликован')
+
+    def test_new_post_invalidates_only_related_pages(self):
         cache.clear()
+        Group.objects.create(
+            title='other', slug='other', description='other group')
+        pages = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test'}),
+            'other': reverse('posts:group_list', kwargs={'slug': 'other'}),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': 'NoName'}),
+        }
+        for url in pages.values():
+            self.guest_client.get(url)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user, text='Новый', group=self.group)
+        for name, url in pages.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                if name == 'other':
+                    self.assertIsNone(response.context)
+                else:
+                    self.assertIsNotNone(response.context)
+
+    def test_signup_keeps_index_cache(self):
+        cache.clear()
+        self.guest_client.get(reverse('posts:index'))
+        with run_on_commit():
+            user = User.objects.create_user(username='Newbie')
+            user.first_name = 'Новичок'
+            user.save()
         response = self.guest_client.get(reverse('posts:index'))
-        self.assertNotEqual(response.content, index_content_cache)
+        self.assertIsNone(response.context)
 
     def test_follow(self):
         self.authorized_client.get(
@@ -207,6 +282,30 @@ class ViewsTests(TestCase):
             user=self.user.id,
             author=self.user_second.id).exists())
 
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.user_second, author=self.user)
+        backfill_timeline(self.user_second.pk, self.user.pk)
+        self.assertEqual(
+            self._get_count_posts_follow(self.authorized_client_second),
+            self.user.posts.count())
+        self.authorized_client_second.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'NoName'}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user_second).exists())
+
+    def test_late_backfill_after_unfollow_leaves_no_posts(self):
+        self.authorized_client_second.get(
+            reverse('posts:profile_follow', kwargs={'username': 'NoName'}))
+        self.authorized_client_second.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'NoName'}))
+        TimelineEntry.objects.create(
+            user=self.user_second, post=self.post, author=self.user,
+            pub_date=self.post.pub_date)
+        self.assertEqual(
+            backfill_timeline(self.user_second.pk, self.user.pk), 0)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user_second).exists())
+
     def _get_count_posts_follow(self, client):
         response = client.get(
             reverse('posts:follow_index')
@@ -216,28 +315,92 @@ class ViewsTests(TestCase):
     def test_new_post_visible_follower(self):
         count_before = self._get_count_posts_follow(
             self.authorized_client_third)
-        Post.objects.create(
+        post = Post.objects.create(
             author=self.user,
             text='Тестовый текст 100500',
             group=self.group,
         )
+        fan_out_post(post.pk)
         count_after = self._get_count_posts_follow(
             self.authorized_client_third)
         self.assertEqual(count_before + 1, count_after)
+        self.assertContains(
+            self.authorized_client_third.get(reverse('posts:follow_index')),
+            'Тестовый текст 100500')
 
     def test_new_post_invisible_not_follower(self):
         count_before = self._get_count_posts_follow(
             self.authorized_client_second)
-        Post.objects.create(
+        post = Post.objects.create(
             author=self.user,
             text='Тестовый текст 100500',
             group=self.group,
         )
+        fan_out_post(post.pk)
         count_after = self._get_count_posts_follow(
             self.authorized_client_second)
         self.assertEqual(count_before, count_after)
 
 
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _follow_writes(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse(name, kwargs={'username': 'NoName'}))
+        return [query['sql'] for query in queries
+                if '"posts_follow"' in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_follow_and_unfollow_write_once(self):
+        self.assertEqual(len(self._follow_writes('posts:profile_follow')), 1)
+        self.assertEqual(len(self._follow_writes('posts:profile_follow')), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            len(self._follow_writes('posts:profile_unfollow')), 1)
+        self.assertEqual(
+            len(self._follow_writes('posts:profile_unfollow')), 0)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_reads_cached_graph(self):
+        url = reverse('posts:profile', kwargs={'username': 'NoName'})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(response.context['following'])
+        self.assertFalse(any('"posts_follow"' in query['sql']
+                             for query in queries))
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.author)
+            # Чтение до коммита кладёт в кеш старое множество: коммит
+            # должен его сбросить.
+            self.assertEqual(following_ids(self.reader.pk), frozenset())
+        response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(following_ids(self.reader.pk), {self.author.pk})
+
+    def test_follow_and_unfollow_update_stats(self):
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'NoName'}))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 1)
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'NoName'}))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0)
+
+
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls) -> None:
@@ -266,11 +429,25 @@ class PaginatorViewsTest(TestCase):
             COUNT_POSTS_ON_PAGE)
 
     def _second_page_contains_three_records(self, reverse_name):
+        first_page = self.authorized_client.get(reverse_name)
         response = self.authorized_client.get(
-            reverse_name + '?page=2')
+            reverse_name + first_page.context['page_obj'].next_querystring)
         self.assertEqual(
             len(response.context['page_obj']),
             SECOND_PAGE_POST)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def _previous_page_returns_first_page(self, reverse_name):
+        first_page = self.authorized_client.get(reverse_name)
+        second_page = self.authorized_client.get(
+            reverse_name + first_page.context['page_obj'].next_querystring)
+        response = self.authorized_client.get(
+            reverse_name
+            + second_page.context['page_obj'].previous_querystring)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page.context['page_obj']))
+        self.assertFalse(response.context['page_obj'].has_previous())
 
     def test_paginator(self):
         templates_pages_names = {
@@ -286,6 +463,202 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 self._first_page_contains_ten_records(reverse_name)
                 self._second_page_contains_three_records(reverse_name)
+                self._previous_page_returns_first_page(reverse_name)
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(
+            len(response.context['page_obj']),
+            COUNT_POSTS_ON_PAGE)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='NoName', first_name='Старое')
+        cls.group = Group.objects.create(
+            title='test',
+            slug='test',
+            description='test group'
+        )
+        Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.url = reverse('posts:group_list', kwargs={'slug': 'test'})
+
+    def test_page_scope_keys_are_memcached_safe(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            get_generations([group_page_scope('Тестовый слаг ' * 20),
+                             profile_page_scope('user name')])
+
+    def test_card_cached_until_author_saved(self):
+        self.assertContains(self.guest_client.get(self.url), 'Старое')
+        User.objects.filter(pk=self.user.pk).update(first_name='Новое')
+        self.assertContains(self.guest_client.get(self.url), 'Старое')
+        self.user.first_name = 'Новое'
+        with run_on_commit():
+            self.user.save()
+        self.assertContains(self.guest_client.get(self.url), 'Новое')
+
+    def test_generation_bumped_after_commit(self):
+        scope = author_scope(self.user.pk)
+        before = get_generations([scope])[scope]
+        with run_on_commit():
+            self.user.save()
+            self.assertEqual(get_generations([scope])[scope], before)
+        self.assertNotEqual(get_generations([scope])[scope], before)
+
+    def test_card_rerendered_after_post_edit(self):
+        self.guest_client.get(self.url)
+        post = Post.objects.get(text='Тестовый текст')
+        post.text = 'Исправленный текст'
+        with run_on_commit():
+            post.save()
+        self.assertContains(
+            self.guest_client.get(self.url), 'Исправленный текст')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='test', slug='test', description='test group')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый текст', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = {
+            'post': reverse('posts:post_detail',
+                            kwargs={'post_id': self.post.pk}),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test'}),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': 'NoName'}),
+        }
+
+    def _revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_return_304_before_queries(self):
+        queries = {'post': 1, 'group': 0, 'profile': 0}
+        for name, url in self.urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(queries[name]):
+                    repeated = self._revalidate(
+                        self.guest_client, url, response)
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        responses = {
+            name: self.guest_client.get(url)
+            for name, url in self.urls.items()
+        }
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Ок')
+        response = self._revalidate(
+            self.guest_client, self.urls['post'], responses['post'])
+        self.assertEqual(response.status_code, 200)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user, group=self.group, text='Ещё')
+        for name in ('group', 'profile'):
+            with self.subTest(page=name):
+                response = self._revalidate(
+                    self.guest_client, self.urls[name], responses[name])
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        url = self.urls['profile']
+        anonymous = self.guest_client.get(url)
+        authorized = self.authorized_client.get(url)
+        self.assertNotEqual(anonymous['ETag'], authorized['ETag'])
+        self.assertIn('private', authorized['Cache-Control'])
+        response = self._revalidate(self.authorized_client, url, anonymous)
+        self.assertEqual(response.status_code, 200)
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.user)
+        response = self._revalidate(self.authorized_client, url, authorized)
+        self.assertEqual(response.status_code, 200)
+
+    def test_relogin_invalidates_etag(self):
+        url = self.urls['post']
+        # Первый ответ ставит cookie csrftoken, дальше ETag стабилен.
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        repeated = self._revalidate(self.authorized_client, url, response)
+        self.assertEqual(repeated.status_code, 304)
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.reader)
+        repeated = self._revalidate(self.authorized_client, url, response)
+        self.assertEqual(repeated.status_code, 200)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.found = Post.objects.create(
+            author=cls.user, text='Путешествие на Байкал')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Рецепт пирога')
+        Comment.objects.create(
+            post=cls.other, author=cls.user, text='Пирог как на Байкале')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def _search(self, query, suffix=''):
+        response = self.guest_client.get(
+            reverse('posts:search') + suffix, {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_posts_and_comments(self):
+        self.assertEqual(self._search('байкал'), [self.found, self.other])
+        self.assertEqual(self._search('пирог'), [self.other])
+        self.assertEqual(self._search('москва'), [])
+
+    def test_search_index_follows_edits(self):
+        self.found.text = 'Поход в горы'
+        self.found.save()
+        self.assertEqual(self._search('горы'), [self.found])
+        self.assertEqual(self._search('путешествие'), [])
+
+    def test_search_cursor_pagination(self):
+        for number in range(COUNT_POSTS_ON_PAGE):
+            Post.objects.create(author=self.user, text=f'Байкал {number}')
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'байкал'})
+        first_page = list(response.context['page_obj'])
+        second_page = self.guest_client.get(
+            reverse('posts:search')
+            + response.context['page_obj'].next_querystring)
+        self.assertEqual(len(first_page), COUNT_POSTS_ON_PAGE)
+        self.assertEqual(len(second_page.context['page_obj']), 2)
+        self.assertFalse(
+            set(first_page) & set(second_page.context['page_obj']))
 
 
 class SecondCreatePostTest(TestCase):
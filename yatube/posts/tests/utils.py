@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from yatube.celery import app as celery_app
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполняет transaction.on_commit, накопленные внутри блока.
+
+    TestCase не коммитит транзакцию, и хуки иначе не сработают. Аналог
+    captureOnCommitCallbacks(execute=True) из Django 3.2; задачи Celery,
+    поставленные хуками, выполняются сразу.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    eager = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    try:
+        yield
+        while len(connection.run_on_commit) > start:
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
+    finally:
+        celery_app.conf.task_always_eager = eager
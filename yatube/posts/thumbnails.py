@@ -0,0 +1,73 @@
+from PIL import features
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+
+# Все миниатюры, которые показывают шаблоны. Каждая режется в нескольких
+# ширинах с одинаковыми пропорциями - для srcset. sorl не умеет AVIF,
+# поэтому формат один: WebP (JPEG, если Pillow собран без WebP).
+RENDITIONS = {
+    'card': {
+        'size': (960, 339),
+        'widths': (480, 960, 1440),
+        'sizes': '(max-width: 992px) 100vw, 960px',
+        'options': {'crop': 'center', 'upscale': True, 'quality': 80},
+    },
+}
+RENDITION_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру в KV-хранилище sorl, ничего не генерируя."""
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = CachedThumbnailBackend()
+
+
+def rendition_geometries(name):
+    """Пары (геометрия, опции) всех ширин миниатюры name."""
+    rendition = RENDITIONS[name]
+    width, height = rendition['size']
+    options = dict(rendition['options'], format=RENDITION_FORMAT)
+    for scaled in rendition['widths']:
+        yield f'{scaled}x{round(height * scaled / width)}', options
+
+
+def get_ready_renditions(image, name):
+    """Готовые миниатюры всех ширин или None, если хоть одной ещё нет."""
+    if not image:
+        return None
+    thumbnails = []
+    for geometry, options in rendition_geometries(name):
+        thumbnail = backend.get_cached_thumbnail(image, geometry, **options)
+        if thumbnail is None:
+            return None
+        thumbnails.append(thumbnail)
+    return thumbnails
+
+
+def generate_thumbnails(image):
+    for name in RENDITIONS:
+        for geometry, options in rendition_geometries(name):
+            get_thumbnail(image, geometry, **options)
+
+
+def delete_images(names):
+    """Удаляет файлы картинок вместе с их миниатюрами и записями sorl."""
+    for name in names:
+        delete(name)
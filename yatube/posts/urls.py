@@ -9,7 +9,7 @@ urlpatterns = [
          views.profile_unfollow,
          name='profile_unfollow'),
     path('profile/<str:username>/follow/',
-         views.ProfileList.as_view(),
+         views.profile_follow,
          name='profile_follow'),
     path('', views.YatubeHome.as_view(), name='index'),
     path('create/', views.PostCreate.as_view(), name='post_create'),
@@ -20,5 +20,9 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
 ]
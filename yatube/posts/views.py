@@ -1,37 +1,98 @@
+from functools import partial
+
 from django.views.generic import ListView, CreateView
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.utils.decorators import method_decorator
 
-from django.core.paginator import Paginator
+from core.paginator import get_cursor_page
+from core.query_budget import query_budget
 
+from .cache import (INDEX_PAGE_SCOPE, cache_anonymous_page,
+                    conditional_page, group_page_scope, group_scope,
+                    post_page_scope, profile_page_scope)
+from .follow_graph import follow, is_following, unfollow
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
+from .models import Comment, Group, Post, User, TimelineEntry
+from .search import search_posts
+from .stats import get_author_stats
+from .tasks import render_post_thumbnails
 
 COUNT_POSTS_ON_PAGE = 10
+COUNT_COMMENTS_ON_PAGE = 20
 
 
 def get_page_obj(request, post_list):
-    paginator = Paginator(post_list, COUNT_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    return get_cursor_page(request, post_list, COUNT_POSTS_ON_PAGE)
+
+
+def schedule_thumbnails(post):
+    transaction.on_commit(partial(render_post_thumbnails.delay, post.pk))
+
+
+def get_comments_page(request, post_id):
+    comments = (Comment.objects
+                .filter(post_id=post_id)
+                .select_related('author'))
+    return get_cursor_page(request, comments, COUNT_COMMENTS_ON_PAGE,
+                           ordering=('created', 'id'))
+
+
+class CursorPaginationMixin:
+    def get_context_data(self, **kwargs):
+        page_obj = get_page_obj(self.request, self.object_list)
+        kwargs.update(page_obj=page_obj, object_list=page_obj.object_list)
+        return super().get_context_data(**kwargs)
 
 
-class YatubeHome(ListView):
-    paginate_by = COUNT_POSTS_ON_PAGE
+def index_page_scopes(**kwargs):
+    return [INDEX_PAGE_SCOPE]
+
+
+def group_page_scopes(slug, **kwargs):
+    return [group_page_scope(slug)]
+
+
+def profile_page_scopes(username, **kwargs):
+    return [profile_page_scope(username)]
+
+
+def post_page_scopes(post_id, **kwargs):
+    """Пост, его комментарии, автор со счётчиками и группа."""
+    post = (Post.objects
+            .filter(pk=post_id)
+            .values('author__username', 'group_id')
+            .first())
+    if post is None:
+        return None
+    scopes = [post_page_scope(post_id),
+              profile_page_scope(post['author__username'])]
+    if post['group_id']:
+        scopes.append(group_scope(post['group_id']))
+    return scopes
+
+
+@method_decorator(cache_anonymous_page(index_page_scopes), name='dispatch')
+@method_decorator(query_budget(3), name='dispatch')
+class YatubeHome(CursorPaginationMixin, ListView):
     template_name = 'posts/index.html'
 
     def get_queryset(self):
-        return Post.objects.select_related('author').all()
+        return Post.objects.select_related('author', 'group').all()
 
 
-class GroupView(ListView):
-    paginate_by = COUNT_POSTS_ON_PAGE
+@method_decorator(conditional_page(group_page_scopes), name='dispatch')
+@method_decorator(cache_anonymous_page(group_page_scopes), name='dispatch')
+@method_decorator(query_budget(4), name='dispatch')
+class GroupView(CursorPaginationMixin, ListView):
     template_name = 'posts/group_list.html'
 
     def get_queryset(self):
         self.group = get_object_or_404(Group, slug=self.kwargs['slug'])
-        return self.group.posts.all()
+        return self.group.posts.select_related('author', 'group')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -39,40 +100,39 @@ class GroupView(ListView):
         return context
 
 
-class ProfileList(ListView):
-    paginate_by = COUNT_POSTS_ON_PAGE
+class ProfileList(CursorPaginationMixin, ListView):
     template_name = 'posts/profile.html'
 
     def get_queryset(self):
-        self.user = get_object_or_404(User, username=self.kwargs['username'])
-        post_list = self.user.posts.all()
-        self.amount_posts = post_list.count()
-        return post_list
+        self.user = get_object_or_404(
+            User.objects.select_related('stats'),
+            username=self.kwargs['username'])
+        return self.user.posts.select_related('group')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            following = Follow.objects.filter(
-                user=self.request.user,
-                author=self.user).exists()
+            following = is_following(self.request.user.pk, self.user.pk)
         else:
             following = True
         my_profile = self.user == self.request.user
         context['following'] = following
         context['author'] = self.user
-        context['amount_posts'] = self.amount_posts
+        context['stats'] = get_author_stats(self.user)
         context['my_profile'] = my_profile
 
 
+@conditional_page(profile_page_scopes)
+@cache_anonymous_page(profile_page_scopes)
+@query_budget(5)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    amount_posts = post_list.count()
+    user = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username)
+    post_list = user.posts.select_related('group')
     page_obj = get_page_obj(request, post_list)
     if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user).exists()
+        following = is_following(request.user.pk, user.pk)
     else:
         following = True
     my_profile = user == request.user
@@ -80,35 +140,71 @@ def profile(request, username):
         'my_profile': my_profile,
         'following': following,
         'author': user,
-        'amount_posts': amount_posts,
+        'stats': get_author_stats(user),
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search_posts(request, query, COUNT_POSTS_ON_PAGE)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional_page(post_page_scopes)
+@query_budget(5)
 def post_detail(request, post_id):
-    post = (Post.objects
-            .select_related('author')
-            .prefetch_related('comments')
-            .get(id=post_id))
-    amount_posts = post.author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id)
     context = {
-        'comments': comments,
+        'comments': get_comments_page(request, post_id),
         'form': CommentForm(),
         'post': post,
-        'amount_posts': amount_posts
+        'stats': get_author_stats(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(1)
+def post_comments(request, post_id):
+    comments = get_comments_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'comments': comments,
+        'post_id': post_id,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
 class PostCreate(LoginRequiredMixin, CreateView):
     template_name = 'posts/create_post.html'
     form_class = PostForm
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super(PostCreate, self).form_valid(form)
+        response = super(PostCreate, self).form_valid(form)
+        if self.object.image:
+            schedule_thumbnails(self.object)
+        return response
 
 @login_required
 def post_create(request):
@@ -121,6 +217,8 @@ def post_create(request):
             new_post = form.save(commit=False)
             new_post.author = request.user
             new_post.save()
+            if new_post.image:
+                schedule_thumbnails(new_post)
             return redirect('posts:profile', request.user.username)
         return render(request, 'posts/create_post.html', {'form': form})
     form = PostForm()
@@ -139,7 +237,9 @@ def post_edit(request, post_id):
             files=request.FILES or None,
         )
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if post.image and 'image' in form.changed_data:
+                schedule_thumbnails(post)
             return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(instance=post)
     return render(request,
@@ -161,10 +261,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(3)
 def follow_index(request):
-    follow = request.user.follower.values('author')
-    post_list = Post.objects.filter(author_id__in=follow)
-    page_obj = get_page_obj(request, post_list)
+    entries = (TimelineEntry.objects
+               .filter(user=request.user)
+               .select_related('post__author', 'post__group'))
+    page_obj = get_cursor_page(request, entries, COUNT_POSTS_ON_PAGE,
+                               ordering=('pub_date', 'post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
     context = {
         'page_obj': page_obj
     }
@@ -174,21 +278,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     if request.user.username != username:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=User.objects.get(username=username)
-        )
+        author = get_object_or_404(User.objects.only('pk'), username=username)
+        follow(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    is_follow = Follow.objects.filter(
-        user=request.user,
-        author=User.objects.get(username=username)).exists()
-    if is_follow:
-        Follow.objects.get(
-            user=request.user,
-            author=User.objects.get(username=username)
-        ).delete()
+    unfollow(request.user.pk, username)
     return redirect('posts:profile', username=username)
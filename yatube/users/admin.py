@@ -0,0 +1,67 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+
+from .deletion import schedule_deletion
+from .models import AccountDeletion, OutgoingEmail, User
+from .tasks import delete_account
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts',
+                    'next_attempt_at', 'created', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
+    readonly_fields = [field.name for field in OutgoingEmail._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ('username', 'status', 'progress_display', 'step',
+                    'deleted_rows', 'total_rows', 'created', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('username',)
+    readonly_fields = [field.name for field in AccountDeletion._meta.fields]
+    actions = ('restart',)
+
+    def progress_display(self, obj):
+        return f'{obj.progress}%'
+    progress_display.short_description = 'Прогресс'
+
+    def restart(self, request, queryset):
+        for deletion in queryset.exclude(status=AccountDeletion.DONE):
+            delete_account.delay(deletion.pk)
+    restart.short_description = 'Перезапустить удаление'
+
+    def has_add_permission(self, request):
+        return False
+
+
+class DeferredDeletionUserAdmin(UserAdmin):
+    """Удаление пользователя из админки уходит в фоновую задачу.
+
+    Страница подтверждения не собирает каскад: у активного автора это
+    сотни тысяч объектов.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        return ([str(obj) for obj in objs],
+                {User._meta.verbose_name_plural: len(objs)}, set(), [])
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+        self.message_user(request, 'Удаление идёт в фоне, прогресс - '
+                                   'в разделе «Удаления аккаунтов».')
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            schedule_deletion(user)
+        self.message_user(request, 'Удаление идёт в фоне, прогресс - '
+                                   'в разделе «Удаления аккаунтов».')
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(AccountDeletion, AccountDeletionAdmin)
+admin.site.unregister(User)
+admin.site.register(User, DeferredDeletionUserAdmin)
@@ -0,0 +1,130 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.cache import (INDEX_PAGE_SCOPE, bump_generations,
+                         group_page_scope, post_page_scope,
+                         profile_page_scope)
+from posts.follow_graph import invalidate as invalidate_graph
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.stats import refresh_stats
+from posts.thumbnails import delete_images
+
+from .models import AccountDeletion
+
+
+def _profile_pages(user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    return [profile_page_scope(username) for username in usernames]
+
+
+def _after_comments(rows):
+    """Авторы комментариев (их счётчики) и страницы постов."""
+    values = list(rows.values_list('author_id', 'post_id'))
+    return ({author_id for author_id, _ in values},
+            [post_page_scope(post_id) for _, post_id in values])
+
+
+def _after_follows(rows):
+    """Вторая сторона подписки: счётчики, страницы, кеш графа."""
+    pairs = list(rows.values_list('user_id', 'author_id'))
+    user_ids = {user_id for pair in pairs for user_id in pair}
+    invalidate_graph(*{user_id for user_id, _ in pairs})
+    return user_ids, _profile_pages(user_ids)
+
+
+def _delete_posts(rows):
+    """Комментарии и записи лент, появившиеся после первых этапов,
+    удаляются вместе с постами. Файлы картинок - после коммита."""
+    posts = list(rows.values_list('pk', 'group_id', 'image'))
+    post_ids = [pk for pk, _, _ in posts]
+    comments = Comment.objects.filter(post_id__in=post_ids)
+    user_ids, scopes = _after_comments(comments)
+    comments._raw_delete(comments.db)
+    entries = TimelineEntry.objects.filter(post_id__in=post_ids)
+    entries._raw_delete(entries.db)
+    slugs = Group.objects.filter(
+        pk__in={group_id for _, group_id, _ in posts}).values_list(
+            'slug', flat=True)
+    transaction.on_commit(partial(
+        delete_images, [image for _, _, image in posts if image]))
+    return user_ids, [*scopes, INDEX_PAGE_SCOPE,
+                      *[post_page_scope(pk) for pk in post_ids],
+                      *[group_page_scope(slug) for slug in slugs]]
+
+
+# Этапы в порядке удаления: (название, модель, фильтр по id пользователя,
+# действие над пачкой перед удалением). Действие возвращает id
+# пользователей, чьи счётчики пересчитать, и области кеша, которые
+# сбросить после коммита пачки.
+STEPS = (
+    ('timeline', TimelineEntry, 'user_id', None),
+    ('timeline_author', TimelineEntry, 'author_id', None),
+    ('comments_on_posts', Comment, 'post__author_id', _after_comments),
+    ('comments', Comment, 'author_id', _after_comments),
+    ('following', Follow, 'user_id', _after_follows),
+    ('followers', Follow, 'author_id', _after_follows),
+    ('posts', Post, 'author_id', _delete_posts),
+)
+
+
+def count_rows(user_id):
+    return sum(model.objects.filter(**{lookup: user_id}).count()
+               for _, model, lookup, _ in STEPS)
+
+
+def schedule_deletion(user):
+    """Блокирует вход и ставит аккаунт в очередь на фоновое удаление."""
+    from .tasks import delete_account
+
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        deletion, created = AccountDeletion.objects.get_or_create(
+            user=user, defaults={'username': user.username,
+                                 'total_rows': count_rows(user.pk)})
+    if created:
+        transaction.on_commit(partial(delete_account.delay, deletion.pk))
+    return deletion
+
+
+def _delete_batch(deletion, step, model, lookup, before_delete):
+    batch = (model.objects
+             .filter(**{lookup: deletion.user_id})
+             .order_by('pk')
+             .values_list('pk', flat=True))
+    with transaction.atomic():
+        pks = list(batch[:settings.DELETION_BATCH_SIZE])
+        if not pks:
+            return False
+        rows = model.objects.filter(pk__in=pks)
+        user_ids, scopes = before_delete(rows) if before_delete else ((), ())
+        rows._raw_delete(rows.db)
+        refresh_stats(list(set(user_ids) - {deletion.user_id}))
+        AccountDeletion.objects.filter(pk=deletion.pk).update(
+            step=step, deleted_rows=F('deleted_rows') + len(pks))
+    bump_generations(*scopes)
+    return True
+
+
+def run_deletion(deletion):
+    """Удаляет данные аккаунта пачками по DELETION_BATCH_SIZE строк.
+
+    Каждая пачка - отдельная короткая транзакция с сырым DELETE, без
+    коллектора Django и сигналов: их работу (счётчики, кеши, файлы)
+    делают действия этапов. Прерванное удаление можно запустить снова -
+    оно продолжит с оставшихся строк. Сам пользователь удаляется
+    обычным delete(), когда связанных строк уже нет.
+    """
+    AccountDeletion.objects.filter(pk=deletion.pk).update(
+        status=AccountDeletion.RUNNING, last_error='')
+    for step, model, lookup, before_delete in STEPS:
+        while _delete_batch(deletion, step, model, lookup, before_delete):
+            pass
+    with transaction.atomic():
+        User.objects.filter(pk=deletion.user_id).delete()
+        AccountDeletion.objects.filter(pk=deletion.pk).update(
+            status=AccountDeletion.DONE, step='', finished_at=timezone.now())
@@ -4,7 +4,7 @@ from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.core.exceptions import ValidationError
 
 from .models import Contact
-from .tasks import send_email_password_reset
+from .outbox import enqueue_template
 
 User = get_user_model()
 
@@ -34,13 +34,9 @@ class UserPasswordResetForm(PasswordResetForm):
 
     def send_mail(self, subject_template_name, email_template_name, context,
                   from_email, to_email, html_email_template_name=None):
-        context['user'] = context['user'].id
-
-        send_email_password_reset.delay(
-            subject_template_name=subject_template_name,
-            email_template_name=email_template_name,
-            context=context, from_email=from_email, to_email=to_email,
-            html_email_template_name=html_email_template_name)
+        enqueue_template(
+            subject_template_name, email_template_name, context,
+            to_email, from_email, html_email_template_name)
 
 
 class ContactForm(forms.ModelForm):
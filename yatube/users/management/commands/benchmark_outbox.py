@@ -0,0 +1,72 @@
+import time
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import OutgoingEmail
+from users.outbox import drain
+from users.smtp_stub import SMTPStub
+
+MARKER = 'benchmark_outbox'
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает отправку писем по одному соединению на письмо '
+            'и разбор outbox пачками через SMTP-заглушку')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--delay', type=float, default=2,
+                            help='Задержка сервера на письмо, мс')
+        parser.add_argument('--connect-delay', type=float, default=30,
+                            help='Задержка на установку соединения, мс '
+                                 '(TLS, приветствие)')
+
+    def _connection(self, stub):
+        return get_connection(SMTP_BACKEND, host='127.0.0.1', port=stub.port)
+
+    def _per_message(self, stub, count):
+        for number in range(count):
+            EmailMultiAlternatives(
+                MARKER, f'Письмо {number}', None,
+                [f'user{number}@example.com'],
+                connection=self._connection(stub)).send()
+        return count
+
+    def _outbox(self, stub, count, batch_size):
+        OutgoingEmail.objects.bulk_create(
+            OutgoingEmail(subject=MARKER, body=f'Письмо {number}',
+                          to=f'user{number}@example.com')
+            for number in range(count))
+        return drain(batch_size, connection=self._connection(stub))
+
+    def _report(self, name, stub, sent, elapsed):
+        self.stdout.write(
+            f'{name:<14} {sent:>8} {stub.connections:>10} '
+            f'{sent / elapsed:>9.1f} {elapsed * 1000 / max(sent, 1):>8.2f}')
+
+    def handle(self, *args, **options):
+        # drain() разбирает всю очередь: настоящие письма ушли бы в заглушку.
+        if OutgoingEmail.objects.filter(
+                status=OutgoingEmail.PENDING).exists():
+            raise CommandError('В outbox есть неотправленные письма')
+        count = options['messages']
+        delays = {'delay': options['delay'] / 1000,
+                  'connect_delay': options['connect_delay'] / 1000}
+        self.stdout.write(f'{"способ":<14} {"писем":>8} {"соединений":>10} '
+                          f'{"писем/с":>9} {"мс/письмо":>8}')
+        try:
+            with SMTPStub(**delays) as stub:
+                started = time.perf_counter()
+                sent = self._per_message(stub, count)
+                self._report('по одному', stub, sent,
+                             time.perf_counter() - started)
+            with SMTPStub(**delays) as stub:
+                started = time.perf_counter()
+                sent = self._outbox(stub, count, options['batch_size'])
+                self._report('outbox', stub, sent,
+                             time.perf_counter() - started)
+        finally:
+            OutgoingEmail.objects.filter(subject=MARKER).delete()
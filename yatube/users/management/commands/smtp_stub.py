@@ -0,0 +1,32 @@
+import time
+from email import message_from_bytes
+
+from django.core.management.base import BaseCommand
+
+from users.smtp_stub import SMTPStub
+
+
+class Command(BaseCommand):
+    help = ('Локальный SMTP-сервер для разработки: принимает письма '
+            'и печатает их заголовки (EMAIL_HOST=127.0.0.1)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--delay', type=float, default=0,
+                            help='Задержка на письмо, с')
+
+    def _print(self, sender, recipients, data):
+        message = message_from_bytes(data)
+        self.stdout.write(
+            f'{sender} -> {", ".join(recipients)}: {message["Subject"]}')
+
+    def handle(self, *args, **options):
+        stub = SMTPStub(port=options['port'], delay=options['delay'],
+                        on_message=self._print)
+        self.stdout.write(f'SMTP-заглушка слушает 127.0.0.1:{stub.port}')
+        with stub:
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Индекс для sweep_unactivated_users: auth_user - таблица
+    django.contrib.auth, поэтому индекс создаётся SQL-запросом."""
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('users', '0003_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_active_joined_idx '
+            'ON auth_user (is_active, date_joined)',
+            'DROP INDEX auth_user_active_joined_idx',
+        ),
+    ]
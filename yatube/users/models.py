@@ -1,4 +1,8 @@
+from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
 
 
 class Contact(models.Model):
@@ -13,3 +17,88 @@ class Contact(models.Model):
     class Meta:
         verbose_name = 'Контакт'
         verbose_name_plural = 'Контакты'
+
+
+class OutgoingEmail(models.Model):
+    """Готовое к отправке письмо в очереди (outbox)."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ждёт отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    html_body = models.TextField('HTML', blank=True)
+    from_email = models.CharField('Отправитель', max_length=254, blank=True)
+    to = models.EmailField('Получатель', max_length=254)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now)
+    claim = models.CharField('Захвачено воркером', max_length=32, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbox_due_idx'),
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self) -> str:
+        return f'{self.to}: {self.subject}'
+
+
+class AccountDeletion(models.Model):
+    """Фоновое удаление аккаунта: связанные строки уходят пачками."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Удаляется'),
+        (DONE, 'Удалён'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.OneToOneField(
+        User,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='deletion',
+        verbose_name='Пользователь')
+    username = models.CharField('Имя пользователя', max_length=150)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    step = models.CharField('Этап', max_length=50, blank=True)
+    total_rows = models.PositiveIntegerField('Строк к удалению', default=0)
+    deleted_rows = models.PositiveIntegerField('Удалено строк', default=0)
+    last_error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Удаление аккаунта'
+        verbose_name_plural = 'Удаления аккаунтов'
+
+    def __str__(self) -> str:
+        return self.username
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.deleted_rows * 100 // self.total_rows)
@@ -0,0 +1,128 @@
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template import loader
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# Сервер отказался принять конкретное письмо. Остальные ошибки (обрыв,
+# авторизация, сеть - все они OSError) касаются соединения целиком.
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError)
+
+
+def enqueue(subject, body, to, from_email=None, html_body=''):
+    """Кладёт письмо в outbox; отправит его drain_outbox после коммита."""
+    from .tasks import drain_outbox
+
+    message = OutgoingEmail.objects.create(
+        subject=' '.join(subject.splitlines()), body=body, to=to,
+        from_email=from_email or '', html_body=html_body or '')
+    transaction.on_commit(drain_outbox.delay)
+    return message
+
+
+def enqueue_template(subject_template_name, email_template_name, context,
+                     to, from_email=None, html_email_template_name=None):
+    """Как PasswordResetForm.send_mail, только письмо уходит в outbox."""
+    html_body = ''
+    if html_email_template_name is not None:
+        html_body = loader.render_to_string(html_email_template_name,
+                                            context)
+    return enqueue(
+        loader.render_to_string(subject_template_name, context),
+        loader.render_to_string(email_template_name, context),
+        to, from_email, html_body)
+
+
+def _claim(batch_size):
+    """Помечает пачку подошедших писем этим воркером.
+
+    next_attempt_at сдвигается на OUTBOX_LEASE_SECONDS: параллельный
+    воркер эти письма не возьмёт, а если этот упадёт - их подберут
+    после истечения аренды.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (OutgoingEmail.objects
+           .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+           .order_by('next_attempt_at', 'pk')
+           .values('pk')[:batch_size])
+    OutgoingEmail.objects.filter(pk__in=due).update(
+        claim=token,
+        next_attempt_at=now + timedelta(
+            seconds=settings.OUTBOX_LEASE_SECONDS))
+    return list(OutgoingEmail.objects.filter(claim=token).order_by('pk'))
+
+
+def _as_email(message, connection):
+    email = EmailMultiAlternatives(
+        message.subject, message.body, message.from_email or None,
+        [message.to], connection=connection)
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def _retry_later(message, error):
+    message.attempts += 1
+    message.last_error = repr(error)[:1000]
+    message.claim = ''
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = OutgoingEmail.FAILED
+    else:
+        delay = settings.OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+        message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    message.save(update_fields=[
+        'attempts', 'last_error', 'claim', 'status', 'next_attempt_at'])
+
+
+def drain(batch_size=None, connection=None):
+    """Отправляет подошедшие письма пачками по одному SMTP-соединению.
+
+    Ошибка одного письма откладывает его с экспоненциальной задержкой,
+    обрыв соединения останавливает разбор очереди до следующего запуска.
+    Возвращает число отправленных писем.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    connection = connection or get_connection()
+    sent = 0
+    try:
+        while True:
+            batch = _claim(batch_size)
+            if not batch:
+                return sent
+            delivered = []
+            broken = False
+            for number, message in enumerate(batch):
+                try:
+                    connection.open()
+                    connection.send_messages([_as_email(message, connection)])
+                except MESSAGE_ERRORS as error:
+                    _retry_later(message, error)
+                except OSError as error:
+                    # Виновато не письмо: остальные ждут вместе с ним.
+                    _retry_later(message, error)
+                    OutgoingEmail.objects.filter(
+                        pk__in=[rest.pk for rest in batch[number + 1:]]
+                    ).update(claim='', next_attempt_at=message.next_attempt_at)
+                    broken = True
+                    break
+                except Exception as error:
+                    # Письмо не собрать (BadHeaderError, ValueError и т. п.):
+                    # без учёта попытки оно уходило бы в повтор бесконечно.
+                    _retry_later(message, error)
+                else:
+                    delivered.append(message.pk)
+            OutgoingEmail.objects.filter(pk__in=delivered).update(
+                status=OutgoingEmail.SENT, claim='', sent_at=timezone.now())
+            sent += len(delivered)
+            if broken:
+                return sent
+    finally:
+        connection.close()
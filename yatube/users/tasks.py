@@ -1,8 +1,28 @@
-from django.contrib.auth.forms import PasswordResetForm
+import logging
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
 from yatube.celery import app
 
+from .deletion import run_deletion, schedule_deletion
+from .models import AccountDeletion
+from .outbox import drain, enqueue_template
+
+logger = logging.getLogger('yatube.users')
+
+
+@app.task
+def drain_outbox():
+    """Разбирает outbox. Запускается после enqueue, а отложенные
+    повторы подбирает по расписанию CELERY_BEAT_SCHEDULE."""
+    return drain()
+
 
+# Письма сброса пароля, поставленные до появления outbox, ещё лежат в
+# брокере: перекладываем их в outbox.
 @app.task
 def send_email_password_reset(
     subject_template_name,
@@ -10,25 +30,80 @@ def send_email_password_reset(
     context,
     from_email,
     to_email,
-    html_email_template_name):
+    html_email_template_name=None):
+    context['user'] = User.objects.filter(pk=context['user']).first()
+    if context['user'] is None:
+        return False
+    enqueue_template(subject_template_name, email_template_name, context,
+                     to_email, from_email, html_email_template_name)
+    return True
+
+
+# Аккаунт так и не активирован: ни входа, ни удаления в процессе.
+UNACTIVATED = {'is_active': False, 'last_login__isnull': True,
+               'deletion__isnull': True}
 
-    context['user'] = User.objects.get(pk=context['user'])
 
-    return PasswordResetForm.send_mail(
-        None,
-        subject_template_name,
-        email_template_name,
-        context,
-        from_email,
-        to_email,
-        html_email_template_name
-    )
+def delete_unactivated(pks):
+    """Удаляет пачку, перепроверяя условия в самом DELETE: пользователь
+    мог активироваться после выборки id. Возвращает число удалённых."""
+    with transaction.atomic():
+        _, deleted = User.objects.filter(pk__in=pks, **UNACTIVATED).delete()
+    return deleted.get(User._meta.label, 0)
+
+
+@app.task
+def sweep_unactivated_users():
+    """Удаляет аккаунты, не активированные за ACTIVATION_TIMEOUT секунд.
+
+    Запускается по расписанию CELERY_BEAT_SCHEDULE. Кандидаты выбираются
+    по индексу auth_user (is_active, date_joined) и удаляются пачками
+    по SWEEP_BATCH_SIZE, каждая в своей короткой транзакции.
+    """
+    deadline = timezone.now() - timedelta(
+        seconds=settings.ACTIVATION_TIMEOUT)
+    expired = (User.objects
+               .filter(date_joined__lt=deadline, **UNACTIVATED)
+               .order_by('date_joined')
+               .values_list('pk', flat=True))
+    deleted = 0
+    while True:
+        batch = list(expired[:settings.SWEEP_BATCH_SIZE])
+        if not batch:
+            break
+        deleted += delete_unactivated(batch)
+    if deleted:
+        logger.info('Удалено неактивированных аккаунтов: %s', deleted)
+    return deleted
+
+
+@app.task
+def delete_account(deletion_id):
+    """Фоновое удаление аккаунта, см. users.deletion.run_deletion."""
+    deletion = (AccountDeletion.objects
+                .filter(pk=deletion_id, user__isnull=False)
+                .exclude(status=AccountDeletion.DONE)
+                .first())
+    if deletion is None:
+        return False
+    try:
+        run_deletion(deletion)
+    except Exception as error:
+        AccountDeletion.objects.filter(pk=deletion_id).update(
+            status=AccountDeletion.FAILED, last_error=repr(error))
+        raise
+    return True
 
 
+# Отложенные задачи, поставленные до появления
+# sweep_unactivated_users, ещё лежат в брокере.
 @app.task
 def check_activation_new_user(user_id):
-    user = User.objects.get(pk=user_id)
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        # Уже удалён: sweep_unactivated_users или администратором.
+        return False
     if user.is_active:
         return True
-    user.delete()
+    schedule_deletion(user)
 
@@ -0,0 +1,250 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import connection
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+from yatube.celery import app as celery_app
+
+from .deletion import schedule_deletion
+from .models import AccountDeletion, OutgoingEmail
+from .outbox import drain, enqueue
+from .smtp_stub import SMTPStub
+from .tasks import (check_activation_new_user, delete_unactivated,
+                    send_email_password_reset, sweep_unactivated_users)
+
+User = get_user_model()
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21'
+    b'\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00'
+    b'\x01\x00\x00\x02\x01\x00\x00\x3b'
+)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_DELAY=60)
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.stub = SMTPStub().start()
+        self.addCleanup(self.stub.stop)
+
+    def _connection(self, port=None):
+        return get_connection(SMTP_BACKEND, host='127.0.0.1',
+                              port=port or self.stub.port)
+
+    def test_password_reset_is_queued(self):
+        User.objects.create_user(
+            username='NoName', email='a@example.com', password='pass')
+        Client().post(reverse('users:password_reset'),
+                      {'email': 'a@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutgoingEmail.objects.get()
+        self.assertEqual(message.to, 'a@example.com')
+        self.assertEqual(drain(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, message.body)
+
+    def test_legacy_password_reset_task_uses_outbox(self):
+        user = User.objects.create_user(
+            username='NoName', email='a@example.com', password='pass')
+        send_email_password_reset(
+            'registration/password_reset_subject.txt',
+            'registration/password_reset_email.html',
+            {'user': user.pk, 'email': user.email, 'domain': 'testserver',
+             'site_name': 'testserver', 'uid': 'MQ', 'token': 'token',
+             'protocol': 'http'},
+            None, 'a@example.com', None)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutgoingEmail.objects.get()
+        self.assertEqual(message.to, 'a@example.com')
+        self.assertIn('NoName', message.body)
+
+    def test_drain_reuses_one_connection(self):
+        for number in range(5):
+            enqueue('Тема', f'Письмо {number}', f'u{number}@example.com')
+        self.assertEqual(drain(2, self._connection()), 5)
+        self.assertEqual(len(self.stub.messages), 5)
+        self.assertEqual(self.stub.connections, 1)
+        self.assertFalse(OutgoingEmail.objects.exclude(
+            status=OutgoingEmail.SENT).exists())
+
+    def test_rejected_message_is_retried_with_backoff(self):
+        self.stub.reject.add('bad@example.com')
+        enqueue('Тема', 'Текст', 'bad@example.com')
+        enqueue('Тема', 'Текст', 'good@example.com')
+        self.assertEqual(drain(connection=self._connection()), 1)
+        message = OutgoingEmail.objects.get(to='bad@example.com')
+        self.assertEqual(message.status, OutgoingEmail.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at,
+                           timezone.now() + timedelta(seconds=50))
+        OutgoingEmail.objects.filter(pk=message.pk).update(
+            next_attempt_at=timezone.now())
+        drain(connection=self._connection())
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutgoingEmail.FAILED)
+
+    def test_broken_message_does_not_block_batch(self):
+        enqueue('Тема', 'Текст', 'bad@example.com\nBcc: x@example.com')
+        enqueue('Тема', 'Текст', 'good@example.com')
+        self.assertEqual(drain(connection=self._connection()), 1)
+        broken = OutgoingEmail.objects.get(status=OutgoingEmail.PENDING)
+        self.assertEqual(broken.attempts, 1)
+        self.assertIn('BadHeaderError', broken.last_error)
+        self.assertEqual(OutgoingEmail.objects.get(
+            to='good@example.com').status, OutgoingEmail.SENT)
+
+    def test_connection_error_postpones_queue(self):
+        enqueue('Тема', 'Текст', 'a@example.com')
+        enqueue('Тема', 'Текст', 'b@example.com')
+        port = self.stub.port
+        self.stub.stop()
+        self.assertEqual(drain(connection=self._connection(port)), 0)
+        messages = OutgoingEmail.objects.order_by('pk')
+        self.assertEqual([message.attempts for message in messages], [1, 0])
+        self.assertFalse(messages.filter(
+            next_attempt_at__lte=timezone.now()).exists())
+
+
+@override_settings(ACTIVATION_TIMEOUT=60, SWEEP_BATCH_SIZE=2)
+class SweepUnactivatedUsersTest(TestCase):
+    def _user(self, username, is_active=False, minutes=10, last_login=None):
+        return User.objects.create(
+            username=username, is_active=is_active, last_login=last_login,
+            date_joined=timezone.now() - timedelta(minutes=minutes))
+
+    def test_signup_queues_activation_mail(self):
+        Client().post(reverse('users:signup'), {
+            'username': 'NoName',
+            'email': 'a@example.com',
+            'password1': 'Zx9-secret-pass',
+            'password2': 'Zx9-secret-pass',
+        })
+        self.assertFalse(User.objects.get(username='NoName').is_active)
+        self.assertEqual(OutgoingEmail.objects.get().to, 'a@example.com')
+
+    def test_sweep_deletes_only_expired(self):
+        for number in range(5):
+            self._user(f'expired{number}')
+        kept = [
+            self._user('recent', minutes=0),
+            self._user('active', is_active=True),
+            self._user('banned', last_login=timezone.now()),
+        ]
+        self.assertEqual(sweep_unactivated_users(), 5)
+        self.assertQuerysetEqual(User.objects.order_by('pk'),
+                                 map(repr, kept))
+
+    def test_user_activated_after_select_is_kept(self):
+        expired = [self._user('expired'), self._user('activated')]
+        User.objects.filter(username='activated').update(is_active=True)
+        self.assertEqual(
+            delete_unactivated([user.pk for user in expired]), 1)
+        self.assertQuerysetEqual(User.objects.all(),
+                                 [repr(expired[1])])
+
+    def test_legacy_activation_check_for_deleted_user(self):
+        user = self._user('expired')
+        sweep_unactivated_users()
+        self.assertFalse(check_activation_new_user(user.pk))
+
+    def test_sweep_query_uses_index(self):
+        self._user('expired')
+        with CaptureQueriesContext(connection) as queries:
+            sweep_unactivated_users()
+        sql = queries[0]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('auth_user_active_joined_idx', plan)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, DELETION_BATCH_SIZE=2)
+class AccountDeletionTest(TransactionTestCase):
+    """Настоящие коммиты: картинки удаляются в transaction.on_commit."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', eager)
+        self.author = User.objects.create_user(username='NoName')
+        self.reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(
+            title='test', slug='test', description='test group')
+        self.posts = [
+            Post.objects.create(author=self.author, group=group,
+                                text=f'Пост {number}')
+            for number in range(4)
+        ]
+        self.image_post = Post.objects.create(
+            author=self.author, text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        reader_post = Post.objects.create(author=self.reader, text='Свой')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Comment.objects.create(post=reader_post, author=self.author,
+                               text='Ок')
+
+    def test_deletion_removes_rows_in_batches(self):
+        image_path = self.image_post.image.path
+        self.assertTrue(os.path.exists(image_path))
+        deletion = schedule_deletion(self.author)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, AccountDeletion.DONE)
+        self.assertEqual(deletion.progress, 100)
+        self.assertEqual(deletion.deleted_rows, deletion.total_rows)
+        self.assertFalse(User.objects.filter(username='NoName').exists())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exclude(
+            author=self.reader).exists())
+        self.assertFalse(os.path.exists(image_path))
+        stats = AuthorStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count,
+             stats.followers_count, stats.following_count),
+            (1, 0, 0, 0))
+
+
+class DeferredDeletionAdminTest(TestCase):
+    def test_admin_delete_is_deferred(self):
+        user = User.objects.create_user(username='NoName')
+        Post.objects.create(author=user, text='Пост')
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[user.pk])
+        self.assertEqual(client.get(url).status_code, 200)
+        client.post(url, {'post': 'yes'})
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        deletion = AccountDeletion.objects.get(user=user)
+        self.assertEqual(deletion.status, AccountDeletion.QUEUED)
+        self.assertEqual(deletion.total_rows, 1)
+        self.assertTrue(Post.objects.filter(author=user).exists())
+        response = client.get(
+            reverse('admin:users_accountdeletion_changelist'))
+        self.assertContains(response, '0%')
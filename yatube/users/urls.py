@@ -2,6 +2,7 @@ import django.contrib.auth.views as djv
 from django.urls import path
 
 from . import views
+from .forms import UserPasswordResetForm
 
 app_name = 'users'
 
@@ -38,7 +39,8 @@ urlpatterns = [
     path(
         'password-reset/',
         djv.PasswordResetView.as_view(
-            template_name='users/password_reset_form.html'
+            template_name='users/password_reset_form.html',
+            form_class=UserPasswordResetForm
         ),
         name='password_reset'
     ),
@@ -8,12 +8,11 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.http import HttpResponseRedirect, HttpResponse
 from django.utils.encoding import force_bytes
-from django.core.mail import EmailMessage
 from django.core.exceptions import ValidationError
 
 from .forms import ContactForm, SignupForm, UserPasswordResetForm
+from .outbox import enqueue
 from posts.models import User
-from users.tasks import check_activation_new_user
 from .token import TokenGenerator
 
 
@@ -26,7 +25,6 @@ class ViewSignupUser(FormView):
         user = form.save(commit=False)
         user.is_active = False
         user.save()
-        check_activation_new_user.apply_async(args=[user.pk], countdown=360)
         current_site = get_current_site(self.request)
         mail_subject = 'Activation link has been sent to your email id'
         message = render_to_string('users/acc_active_email.html', {
@@ -35,11 +33,7 @@ class ViewSignupUser(FormView):
             'uid': urlsafe_base64_encode(force_bytes(user.pk)),
             'token': TokenGenerator().make_token(user),
         })
-        to_email = form.cleaned_data.get('email')
-        email = EmailMessage(
-            mail_subject, message, to=[to_email]
-        )
-        email.send()
+        enqueue(mail_subject, message, form.cleaned_data.get('email'))
         return HttpResponse(
             'Please confirm your email address to complete the registration')
 
@@ -13,7 +13,7 @@ load_dotenv(os.path.join(BASE_DIR, '.env'))
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -44,7 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryViewMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_router.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,7 +64,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,7 +79,21 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Шаблоны разбираются один раз на процесс, debug_toolbar не нужен.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    INSTALLED_APPS.remove('debug_toolbar')
+    MIDDLEWARE.remove('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Разбирать все шаблоны при старте воркера (см. yatube/wsgi.py).
+TEMPLATES_WARMUP = not DEBUG
 
 
 # Database
@@ -87,6 +106,39 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: DATABASE_REPLICAS=replica1.sqlite3,... Локально
+# их наполняет manage.py replicate_sqlite. После записи клиент читает из
+# primary ещё REPLICA_PIN_SECONDS секунд.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name.strip()),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# Боевой профиль SQLite (SQLITE_PRODUCTION=1): WAL, PRAGMA на каждое
+# соединение, BEGIN IMMEDIATE для транзакций и очередь пишущих транзакций
+# внутри процесса (SQLITE_SERIALIZE_WRITES работает только вместе с
+# SQLITE_IMMEDIATE_TRANSACTIONS).
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION') == '1'
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+SQLITE_IMMEDIATE_TRANSACTIONS = SQLITE_PRODUCTION
+SQLITE_SERIALIZE_WRITES = SQLITE_PRODUCTION
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,11 +188,31 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Загружаемые картинки постов: лимиты и параметры пережатия.
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 82
+
+# Кеш должен быть общим для всех процессов: поколения страниц и карточек
+# (posts.cache) сдвигают и веб-воркеры, и задачи Celery. У LocMemCache
+# он свой в каждом процессе - годится только для runserver и тестов,
+# manage.py check --deploy без DEBUG его не пропустит (core.E001).
+CACHE_URL = os.getenv(
+    'CACHE_URL', '' if DEBUG else 'redis://127.0.0.1:6379/1')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -148,9 +220,83 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Метрики /metrics/: процессы копят счётчики у себя и раз в
+# METRICS_FLUSH_INTERVAL секунд складывают их в этот кеш (общий, см.
+# CACHE_URL).
+METRICS_CACHE = 'default'
+METRICS_FLUSH_INTERVAL = 5
+
+# Запросы дольше порога (мс) попадают в лог и таблицу SlowQuery.
+# None отключает запись.
+SLOW_QUERY_THRESHOLD_MS = 100
+
+# Профилировщик: доля запросов (0 - только по подписанному заголовку
+# X-Profile, см. manage.py profiler_token) и период сэмплирования стека.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+PROFILER_INTERVAL_MS = 5
+PROFILER_TOKEN_MAX_AGE = 24 * 60 * 60
+
+LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+os.makedirs(LOGS_DIR, exist_ok=True)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '%(asctime)s %(levelname)s %(message)s',
+        },
+    },
+    'handlers': {
+        'slow_queries_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOGS_DIR, 'slow_queries.log'),
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'timestamped',
+        },
+    },
+    'loggers': {
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
+CELERY_BEAT_SCHEDULE = {
+    'drain-outbox': {
+        'task': 'users.tasks.drain_outbox',
+        'schedule': 60,
+    },
+    'sweep-unactivated-users': {
+        'task': 'users.tasks.sweep_unactivated_users',
+        'schedule': 60,
+    },
+}
+
+# Аккаунт, не активированный по ссылке из письма за ACTIVATION_TIMEOUT
+# секунд, удаляет sweep_unactivated_users (пачками по SWEEP_BATCH_SIZE).
+ACTIVATION_TIMEOUT = 6 * 60
+SWEEP_BATCH_SIZE = 500
+
+# Удаление аккаунта (users.deletion) идёт в фоне пачками по
+# DELETION_BATCH_SIZE строк, каждая в своей короткой транзакции.
+DELETION_BATCH_SIZE = 1000
+
+# Исходящая почта (users.outbox): письма копятся в OutgoingEmail и
+# уходят пачками по OUTBOX_BATCH_SIZE через одно SMTP-соединение.
+# Неудачная попытка повторяется через OUTBOX_RETRY_DELAY * 2 ** n секунд.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LEASE_SECONDS = 5 * 60
 
 if os.getenv('EMAIL_HOST'):
     EMAIL_HOST = os.getenv('EMAIL_HOST')